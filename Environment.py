@@ -1,368 +1,210 @@
 import math
-import os
 import time
 import pygame
 from advanced_UI import game_UI
-from components.world_gen import spawn_objects
+from components.simulation import Simulation
+from components.text_cache import TEXT_CACHE
 
 
 # TODO: add controls for multiple players
 # TODO: add dummy bots so that they can train models
 
-class Env:
+class Env(Simulation):
+    """
+    The game environment: the Simulation core plus an optional rendering layer.
+    In training mode nothing is rendered: pygame's display, mixer and clock are never started
+    and no surfaces are allocated.
+
+    To spectate without slowing the simulation down, pass max_tick_rate=None and render_fps (or render_every):
+    the simulation then steps as fast as it can and only some of the ticks are rendered.
+    """
+
     def __init__(self, training=False, use_game_ui=True, world_width=1280, world_height=1280, display_width=640,
-                 display_height=640, n_of_obstacles=10):
-        pygame.init()
+                 display_height=640, n_of_obstacles=10, tick_rate=120, obs_mode="dict", batched_act=False,
+                 max_tick_rate=120, render_every=1, render_fps=None):
+        """
+        :param max_tick_rate: Maximum number of steps per real second (pygame clock), None to run unthrottled
+        :param render_every: Render only every this many steps
+        :param render_fps: Maximum number of rendered frames per real second, None for no limit; the steps in
+            between are not rendered
+        """
+        super().__init__(world_width, world_height, n_of_obstacles, tick_rate, obs_mode, batched_act)
 
         self.training_mode = training
+        self.use_advanced_UI = use_game_ui
 
             # ONLY FOR DISPLAY
-        # Create display window with desired display dimensions
         self.display_width = display_width
         self.display_height = display_height
-        # Only create a window if not in training mode
-        if not self.training_mode:
-            self.screen = pygame.display.set_mode((display_width, display_height))
-        else:
-            os.environ['SDL_VIDEODRIVER'] = 'dummy'  # Disable actual video output
-            pygame.display.set_mode((1, 1))  # Minimal display
+        self.screen = None
+        self.world_surface = None
+        self.clock = None
+        self.advanced_UI = None
+
+        # Frame skip, see render_due
+        self.max_tick_rate = max_tick_rate
+        self.render_every = render_every
+        self.render_fps = render_fps
+        self.steps_since_render = 0
+        self.last_render_time = 0.0
 
-            self.screen = pygame.Surface((display_width, display_height))
+        if self.training_mode:
+            return
+
+        pygame.init()
+        # Fonts and surfaces cached during an earlier pygame session (before a pygame.quit()) are no longer valid
+        TEXT_CACHE.clear()
+
+        # Create display window with desired display dimensions
+        self.screen = pygame.display.set_mode((display_width, display_height))
 
-        # REAL WORLD DIMENSIONS
         # Create an off-screen surface for the game world
-        self.world_width = world_width
-        self.world_height = world_height
         self.world_surface = pygame.Surface((world_width, world_height))
 
         self.clock = pygame.time.Clock()
-        self.running = True
 
-        self.use_advanced_UI = use_game_ui
         if self.use_advanced_UI:
             self.advanced_UI = game_UI(self.world_surface, self.world_width, self.world_height)
-
-        if not self.training_mode and self.use_advanced_UI:
             self.advanced_UI.display_opening_screen()
 
-        self.n_of_obstacles = n_of_obstacles
-        self.min_obstacle_size = (50, 50)
-        self.max_obstacle_size = (100, 100)
-
-        # INIT SOME VARIABLES
-        self.OG_bots = None
-        self.OG_players = None
-        self.OG_obstacles = None
-
-        self.bots = None
-        self.players = None
-        self.obstacles = None
-
-        """REWARD VARIABLES"""
-        self.last_positions = {}
-        self.last_damage = {}
-        self.last_kills = {}
-        self.last_health = {}
-        self.visited_areas = {}
-
-        self.visited_areas.clear()
-        self.last_positions.clear()
-        self.last_health.clear()
-        self.last_kills.clear()
-        self.last_damage.clear()
-
-        self.steps = 0
-
-    def set_players_bots_objects(self, players, bots, obstacles=None):
-        self.OG_players = players
-        self.OG_bots = bots
-        self.OG_obstacles = obstacles
-
-        self.reset()
-
-    def get_world_bounds(self):
-        return (0, 0, self.world_width, self.world_height)
+    def create_obstacles(self, randomize_objects=False):
+        if self.advanced_UI is not None:
+            # Use the obstacles from game_UI
+            return self.advanced_UI.obstacles
+        return super().create_obstacles(randomize_objects)
 
-    def reset(self, randomize_objects=False, randomize_players=False):
-        self.running = True
+    def reset(self, randomize_objects=False, randomize_players=False, seed=None):
         if not self.training_mode:
-            if not self.use_advanced_UI:
+            if self.advanced_UI is None:
                 self.screen.fill("green")
                 pygame.display.flip()
                 time.sleep(1)
             else:
                 self.advanced_UI.display_reset_screen()
 
-        else:
-            # In training mode, you might simply clear the screen without delay.
-            self.screen.fill("green")
-
-        self.last_positions = {}
-        self.last_damage = {}
-        self.last_kills = {}
-        self.last_health = {}
-        self.visited_areas = {}
-
-        """
-        self.visited_areas.clear()
-        self.last_positions.clear()
-        self.last_health.clear()
-        self.last_kills.clear()
-        self.last_damage.clear()"""
-
-        self.steps = 0
-
-        # TODO: add variables for parameters
-        if self.use_advanced_UI:
-            # Use the obstacles from game_UI
-            self.obstacles = self.advanced_UI.obstacles
-        else:
-            # Create new obstacles only if needed
-            if randomize_objects or self.OG_obstacles is None:
-                self.OG_obstacles = spawn_objects(
-                    (0, 0, self.world_width, self.world_height),
-                    self.max_obstacle_size,
-                    self.min_obstacle_size,
-                    self.n_of_obstacles
-                )
-            self.obstacles = self.OG_obstacles
-
-        self.players = self.OG_players.copy()
-        self.bots = self.OG_bots
-        if randomize_players:
-            self.bots = self.bots.shuffle()
-            for index in range(len(self.players)):
-                self.players[index].related_bot = self.bots[index]  # ensuring bots change location
-
-        else:
-            for index in range(len(self.players)):
-                self.players[index].related_bot = self.bots[index]
-
-        for player in self.players:
-            player.reset()
-            temp = self.players.copy()
-            temp.remove(player)
-            player.players = temp  # Other players
-            player.objects = self.obstacles
-
-    def step(self, debugging=False):
-        if not self.training_mode:
-            if self.use_advanced_UI:
-                # Use the background from game_UI
-                self.world_surface.blit(self.advanced_UI.background, (0, 0))
+        super().reset(randomize_objects, randomize_players, seed)
+
+        if self.advanced_UI is not None:
+            self.advanced_UI.build_static_layer(self.obstacles)
+
+    def after_step(self, finished, info_dictionary):
+        if self.training_mode:
+            return
+        self.steps_since_render += 1
+        if finished or self.render_due():
+            self.render(info_dictionary, finished)
+
+        if self.max_tick_rate:
+            self.phase_timer.begin()
+            self.clock.tick(self.max_tick_rate)
+            self.phase_timer.lap("clock_tick")
+
+    def render_due(self):
+        # Whether this step is rendered: every render_every steps, and no more than render_fps times per second
+        if self.steps_since_render < self.render_every:
+            return False
+        if self.render_fps and time.perf_counter() - self.last_render_time < 1 / self.render_fps:
+            return False
+        return True
+
+    def render(self, info_dictionary, finished=False):
+        self.phase_timer.begin()
+        self.steps_since_render = 0
+        self.last_render_time = time.perf_counter()
+        if finished:
+            if self.advanced_UI is not None:
+                self.advanced_UI.display_winner_screen(self.alive_players)
             else:
-                self.world_surface.fill("purple")
-
-        self.steps += 1
-
-        players_info = {}
-        alive_players = []
-
-        for player in self.players:
-            actions = player.related_bot.act(player.get_info())
-
-            if player.alive:
-
-                alive_players.append(player)
-                player.reload()
-
-                # only draw if not in training mode.
-                if not self.training_mode:
+                self.screen.fill("green")
+            self.phase_timer.lap("render")
+            return
+
+        for player in self.alive_players:
+            # Store position for trail
+            if not hasattr(player, 'previous_positions'):
+                player.previous_positions = []
+            player.previous_positions.append(player.rect.center)
+            if len(player.previous_positions) > 10:
+                player.previous_positions.pop(0)
+
+        changed = None
+        if self.advanced_UI is not None:
+            changed = self.advanced_UI.draw_everything(info_dictionary, self.players, self.obstacles)
+        else:
+            self.world_surface.fill("purple")
+            for player in self.players:
+                if player.alive:
                     player.draw(self.world_surface)
-
-                if debugging:
-                    print("Bot would like to do:", actions)
-                if actions["forward"]:
-                    player.move_in_direction("forward")
-                if actions["right"]:
-                    player.move_in_direction("right")
-                if actions["down"]:
-                    player.move_in_direction("down")
-                if actions["left"]:
-                    player.move_in_direction("left")
-                if actions["rotate"]:
-                    player.add_rotate(actions["rotate"])
-                if actions["shoot"]:
-                    player.shoot()
-
-                if not self.training_mode:
-                    # Store position for trail
-                    if not hasattr(player, 'previous_positions'):
-                        player.previous_positions = []
-                    player.previous_positions.append(player.rect.center)
-                    if len(player.previous_positions) > 10:
-                        player.previous_positions.pop(0)
-
-            players_info[player.username] = player.get_info()
-
-            players_info[player.username]["shot_fired"] = actions["shoot"]
-
-
-        new_dic = {
-            "general_info": {
-                "total_players": len(self.players),
-                "alive_players": len(alive_players)
-            },
-            "players_info": players_info
-        }
-
-        if len(alive_players) == 1:
-            print("Game Over, winner is:", alive_players[0].username)
-            if not self.training_mode:
-                if self.use_advanced_UI:
-                    self.advanced_UI.display_winner_screen(alive_players)
-                else:
-                    self.screen.fill("green")
-
-            # self.running = False
-            print("Total steps:", self.steps)
-            return True, new_dic  # Game is over
-
-        if self.use_advanced_UI:
-            self.advanced_UI.draw_everything(new_dic, self.players, self.obstacles)
-        elif not self.training_mode:
             # Draw obstacles manually if not using advanced UI
             for obstacle in self.obstacles:
                 obstacle.draw(self.world_surface)
 
-        if not self.training_mode:
+        self.present(changed)
+        self.phase_timer.lap("render")
+
+    def present(self, changed=None):
+        """
+        Scales the world surface onto the display window.
+        :param changed: The areas of the world surface that changed since the last frame; only those are scaled
+            and updated on the display. None (or changes covering most of the world) presents everything.
+        """
+        display_rects = None
+        if changed is not None:
+            display_rects = self.changed_display_rects(changed)
+
+        if display_rects is None:
             scaled_surface = pygame.transform.scale(self.world_surface, (self.display_width, self.display_height))
             self.screen.blit(scaled_surface, (0, 0))
             pygame.display.flip()
+            return
 
-        # In training mode, you might not call tick or you can use a high tick rate.
-        if not self.training_mode:
-            self.clock.tick(120)
-        else:
-            self.clock.tick(10000000)  # Use a high FPS limit in training mode.
-
-        return False, new_dic
-
-    """TO MODIFY"""
-    def calculate_reward_empty(self, info_dictionary, bot_username):
-        """THIS FUNCTION IS USED TO CALCULATE THE REWARD FOR A BOT"""
-        """NEEDS TO BE WRITTEN BY YOU TO FINE TUNE YOURS"""
-
-        # retrieve the players' information from the dictionary
-        players_info = info_dictionary.get("players_info", {})
-        bot_info = players_info.get(bot_username)
-
-        # if the bot is not found, return a default reward of 0
-        if bot_info is None:
-            print("Bot not found in the dictionary")
-            return 0
-
-        # Extract variables from the bot's info
-        location = bot_info.get("location", [0, 0])
-        rotation = bot_info.get("rotation", 0)
-        rays = bot_info.get("rays", [])
-        current_ammo = bot_info.get("current_ammo", 0)
-        alive = bot_info.get("alive", False)
-        kills = bot_info.get("kills", 0)
-        damage_dealt = bot_info.get("damage_dealt", 0)
-        meters_moved = bot_info.get("meters_moved", 0)
-        total_rotation = bot_info.get("total_rotation", 0)
-        health = bot_info.get("health", 0)
-
-        # Calculate reward:
-        reward = 0
-        # Add your reward calculation here
-
-        return reward
-
-    def calculate_reward(self, info_dictionary, bot_username):
+        for world_rect, display_rect in display_rects:
+            area = self.world_surface.subsurface(world_rect)
+            if display_rect.size != world_rect.size:
+                area = pygame.transform.scale(area, display_rect.size)
+            self.screen.blit(area, display_rect)
+        pygame.display.update([display_rect for _, display_rect in display_rects])
+
+    def changed_display_rects(self, changed, max_share=0.5):
         """
-        Reward function for training bots.
-        Reward components (one-time per step):
-          1. Walking: if the bot moves, +1 (only if it moved this step).
-          2. Exploring: if the bot enters a new grid cell (e.g., 100x100), +5.
-          3. Damage: reward the damage inflicted this frame.
-          4. Kill: reward massively for new kills (+20 per kill).
-          5. Negative reward for missing: if a shot was fired and no damage was dealt, -1.
-          6. Negative reward if hit by enemy: if health decreases compared to last step, negative penalty.
-          7. Negative reward for staying near the borders: if within 50 pixels of any border, -1.
-
-        Additionally, all rewards are scaled by a time-based multiplier that decays over the episode.
+        Maps changed areas of the world surface to the display.
+        Areas are grown to blocks whose size in pixels is a whole number both in the world and on the display
+        (8 world pixels are 5 display pixels for 1280 -> 800), so scaling each area on its own samples the same
+        pixels as scaling the whole world surface, and overlapping areas are merged.
+        :return: (world rect, display rect) pairs, or None if a full present is cheaper (the changed areas
+            cover more than max_share of the world, or the sizes have no usable common block)
         """
-        players_info = info_dictionary.get("players_info", {})
-        bot_info = players_info.get(bot_username)
-        if bot_info is None:
-            print(f"Bot {bot_username} not found in info dictionary.")
-            return 0
-
-        # Extract current values
-        current_position = bot_info.get("location", [0, 0])
-        damage_dealt = bot_info.get("damage_dealt", 0)
-        kills = bot_info.get("kills", 0)
-        alive = bot_info.get("alive", False)
-        health = bot_info.get("health", 100)
-        # Expect a flag indicating if a shot was fired this frame
-        shot_fired = bot_info.get("shot_fired", False)
-
-        # Initialize tracking dictionaries if necessary
-        if bot_username not in self.last_positions:
-            self.last_positions[bot_username] = current_position
-        if bot_username not in self.last_damage:
-            self.last_damage[bot_username] = damage_dealt
-        if bot_username not in self.last_kills:
-            self.last_kills[bot_username] = kills
-        if bot_username not in self.last_health:
-            self.last_health[bot_username] = health
-        if bot_username not in self.visited_areas:
-            self.visited_areas[bot_username] = set()
-
-        reward = 0
-
-        # 1. Walking reward (one-time): if moved at all, +1
-        distance_moved = math.dist(current_position, self.last_positions[bot_username])
-        if distance_moved > 0:
-            reward += 0.01
-
-        # 2. Exploration reward (one-time): if entering a new grid cell, +1
-        grid_size = 100  # Adjust as needed.
-        cell = (int(current_position[0] // grid_size), int(current_position[1] // grid_size))
-        if cell not in self.visited_areas[bot_username]:
-            reward += 0.1
-            self.visited_areas[bot_username].add(cell)
-
-        # 3. Damage reward: reward the damage inflicted this frame.
-        delta_damage = damage_dealt - self.last_damage[bot_username]
-        if delta_damage > 0:
-            reward += delta_damage * 2  # 2 point per damage unit
-
-        # 4. Kill reward: massive reward for new kills.
-        delta_kills = kills - self.last_kills[bot_username]
-        if delta_kills > 0:
-            reward += delta_kills * 15  # 15 points per kill
-
-        # 5. Negative reward for missing: if a shot was fired and no damage occurred.
-        if shot_fired and delta_damage <= 0:
-            reward -= 1
-
-        # 6. Negative reward if hit by enemy: if health decreased.
-        delta_health = self.last_health[bot_username] - health
-        if delta_health > 0:
-            reward -= delta_health * 0.2  # Adjust penalty factor as needed
-
-        # 7. Negative reward for staying near the borders.
-        border_threshold = 50
-        near_border = (
-                current_position[0] < border_threshold or
-                current_position[0] > self.world_width - border_threshold or
-                current_position[1] < border_threshold or
-                current_position[1] > self.world_height - border_threshold
-        )
-        if near_border:
-            reward -= 1
-
-        # Update tracking values for next step.
-        self.last_positions[bot_username] = current_position
-        self.last_damage[bot_username] = damage_dealt
-        self.last_kills[bot_username] = kills
-        self.last_health[bot_username] = health
-
-        decay_rate = 0.0001  # Determines how fast the multiplier decays per step.
-        time_multiplier = max(0.2, 1 - decay_rate * self.steps)
-        reward *= time_multiplier
-
-        return reward
\ No newline at end of file
+        world_block_x = self.world_width // math.gcd(self.world_width, self.display_width)
+        world_block_y = self.world_height // math.gcd(self.world_height, self.display_height)
+        display_block_x = self.display_width * world_block_x // self.world_width
+        display_block_y = self.display_height * world_block_y // self.world_height
+        if world_block_x * 4 > self.world_width or world_block_y * 4 > self.world_height:
+            return None
+
+        world = pygame.Rect(0, 0, self.world_width, self.world_height)
+        merged = []
+        for rect in changed:
+            rect = pygame.Rect(rect).clip(world)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            left = rect.left // world_block_x * world_block_x
+            top = rect.top // world_block_y * world_block_y
+            right = -(-rect.right // world_block_x) * world_block_x
+            bottom = -(-rect.bottom // world_block_y) * world_block_y
+            rect = pygame.Rect(left, top, right - left, bottom - top)
+
+            # Merge with the areas it overlaps (block-aligned unions stay block-aligned)
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+
+        if sum(rect.width * rect.height for rect in merged) > max_share * self.world_width * self.world_height:
+            return None
+
+        return [(rect, pygame.Rect(rect.left // world_block_x * display_block_x,
+                                   rect.top // world_block_y * display_block_y,
+                                   rect.width // world_block_x * display_block_x,
+                                   rect.height // world_block_y * display_block_y))
+                for rect in merged]
@@ -5,6 +5,7 @@ import random
 import time
 import math
 from components.crystal_obstacle import CrystalObstacle
+from components.text_cache import TEXT_CACHE
 
 
 class GameMusic:
@@ -89,6 +90,13 @@ class game_UI:
         self.obstacles = self.create_obstacles()
         self.background = self.create_background()
 
+        # Dirty-rect rendering, see build_static_layer and draw_everything
+        self.static_layer = None
+        self.static_obstacles = None
+        self.static_layout = None  # the obstacles and their places the static layer was built for
+        self.dirty_rects = []  # areas of the screen drawn over the static layer during the last frame
+        self.full_redraw = True
+
     def create_obstacles(self):
         obstacles = []
         for _ in range(self.n_of_obstacles):
@@ -158,6 +166,42 @@ class game_UI:
         background.blit(grid_surface, (0, 0))
         return background
 
+    def build_static_layer(self, obstacles):
+        """
+        Composes the background and the obstacles' base shapes, which never move, into one cached surface.
+        Called once per reset; draw_everything then only redraws the areas around what moves or is animated.
+        The layer and the obstacles' glow frames are kept when the obstacles are the same, at the same places,
+        as in the last episode (the game_UI obstacles are reused by every reset).
+        :param obstacles: The obstacles of the new episode
+        """
+        # the obstacles are kept alive by self.static_obstacles, so their ids are not reused
+        layout = [(id(obstacle), tuple(obstacle.rect)) for obstacle in obstacles]
+        if self.static_layer is not None and layout == self.static_layout:
+            self.static_obstacles = obstacles
+            self.dirty_rects = []
+            self.full_redraw = True
+            return
+
+        self.static_layout = layout
+        self.static_layer = self.background.copy()
+        for obstacle in obstacles:
+            if hasattr(obstacle, "draw_base"):
+                obstacle.draw_base(self.static_layer)
+            else:
+                # a plain obstacle has no animated part
+                obstacle.draw(self.static_layer)
+
+        # The glow of an obstacle is drawn under its own crystal and those of the obstacles drawn after it
+        coverage = pygame.Surface((self.world_width, self.world_height), pygame.SRCALPHA)
+        coverage.fill((255, 255, 255, 255))
+        for obstacle in reversed(obstacles):
+            if hasattr(obstacle, "set_glow_mask"):
+                obstacle.cut_out(coverage)
+                obstacle.set_glow_mask(coverage)
+        self.static_obstacles = obstacles
+        self.dirty_rects = []
+        self.full_redraw = True
+
     def display_background(self, time_delay=1):
         self.screen.blit(self.background, (0, 0))
         pygame.display.flip()
@@ -185,9 +229,8 @@ class game_UI:
                 pygame.draw.circle(screen, color, (x, y), size)
 
             # Title with shadow effect
-            title_font = pygame.font.Font(None, 86)
-            title_text = title_font.render("COSMIC BATTLE", True, title_color)
-            shadow_text = title_font.render("COSMIC BATTLE", True, (50, 50, 100))
+            title_text = TEXT_CACHE.render("COSMIC BATTLE", 86, title_color)
+            shadow_text = TEXT_CACHE.render("COSMIC BATTLE", 86, (50, 50, 100))
 
             title_rect = title_text.get_rect(center=(screen_width / 2, screen_height / 3))
             shadow_rect = shadow_text.get_rect(center=(screen_width / 2, screen_height / 3 + 3))
@@ -196,8 +239,7 @@ class game_UI:
             screen.blit(title_text, title_rect)
 
             # Subtitle with subtle animation
-            subtitle_font = pygame.font.Font(None, 44)
-            subtitle_text = subtitle_font.render("Press Any Key to Start", True, subtitle_color)
+            subtitle_text = TEXT_CACHE.render("Press Any Key to Start", 44, subtitle_color)
             subtitle_rect = subtitle_text.get_rect(center=(screen_width / 2, screen_height / 2 + 100))
 
             # Blinking effect
@@ -223,10 +265,8 @@ class game_UI:
         overlay.fill((25, 10, 40, 180))  # Semi-transparent deep purple
         screen.blit(overlay, (0, 0))
 
-        reset_font = pygame.font.Font(None, 74)
-
-        reset_text = reset_font.render("Resetting...", True, (255, 255, 255))
-        glow_text = reset_font.render("Resetting...", True, (147, 112, 219))
+        reset_text = TEXT_CACHE.render("Resetting...", 74, (255, 255, 255))
+        glow_text = TEXT_CACHE.render("Resetting...", 74, (147, 112, 219))
 
         glow_rect = glow_text.get_rect(center=(screen_width / 2 + 2, screen_height / 2 + 2))
         reset_rect = reset_text.get_rect(center=(screen_width / 2, screen_height / 2))
@@ -260,16 +300,15 @@ class game_UI:
         screen.blit(overlay, (0, 0))
 
         # Winner text with glow effect
-        font = pygame.font.Font(None, 86)
-        main_text = font.render(f"VICTORY!", True, (255, 255, 255))
-        glow_text = font.render(f"VICTORY!", True, (147, 112, 219))
+        main_text = TEXT_CACHE.render("VICTORY!", 86, (255, 255, 255))
+        glow_text = TEXT_CACHE.render("VICTORY!", 86, (147, 112, 219))
 
         main_rect = main_text.get_rect(center=(screen_width / 2, screen_height / 2 - 50))
         glow_rect = glow_text.get_rect(center=(screen_width / 2 + 2, screen_height / 2 - 48))
 
         # Player name
-        name_font = pygame.font.Font(None, 64)
-        name_text = name_font.render(f"{alive_players[0].username}", True, (200, 200, 255))
+        name = alive_players[0].username if alive_players else "No survivors"
+        name_text = TEXT_CACHE.render(name, 64, (200, 200, 255))
         name_rect = name_text.get_rect(center=(screen_width / 2, screen_height / 2 + 30))
 
         # Draw celebratory particles (crystal shards)
@@ -306,8 +345,7 @@ class game_UI:
         screen.blit(name_text, name_rect)
 
         # Add a prompt to continue
-        prompt_font = pygame.font.Font(None, 36)
-        prompt_text = prompt_font.render("Press any key to continue...", True, (200, 200, 255))
+        prompt_text = TEXT_CACHE.render("Press any key to continue...", 36, (200, 200, 255))
         prompt_rect = prompt_text.get_rect(center=(screen_width / 2, screen_height - 100))
 
         # Only show prompt text every half second (blinking effect)
@@ -325,31 +363,46 @@ class game_UI:
             pygame.time.delay(40)
 
     def draw_everything(self, dictionary, players, obstacles):
-        self.screen.blit(self.background, (0, 0))
+        """
+        Draws a frame over the static layer: the areas drawn over during the last frame are restored from it,
+        then the obstacle effects and the players are drawn.
+        :return: The areas of the screen that changed (a list of rects), or None if the whole screen did
+        """
+        if self.static_layer is None or obstacles is not self.static_obstacles:
+            self.build_static_layer(obstacles)
+
+        if self.full_redraw:
+            self.screen.blit(self.static_layer, (0, 0))
+        else:
+            for rect in self.dirty_rects:
+                self.screen.blit(self.static_layer, rect, rect)
+
+        dirty = []
 
         # Draw obstacles
         for obstacle in obstacles:
-            obstacle.draw(self.screen)
+            if hasattr(obstacle, "draw_effects"):
+                dirty.append(obstacle.draw_effects(self.screen))
 
         # Draw players
         for player in players:
             if player.alive:
-                player.draw(self.screen)
+                dirty.extend(player.draw(self.screen))
 
-        pygame.display.flip()
+        changed = None if self.full_redraw else self.dirty_rects + dirty
+        self.dirty_rects = dirty
+        self.full_redraw = False
 
         # Retrieve players' information
         players_info = dictionary.get("players_info", {})
 
         for bot_info in players_info:
-            print(bot_info)
-
             bot_info = players_info.get(bot_info)
 
             # if the bot is not found, return a default reward of 0
             if bot_info is None:
                 print("Bot not found in the dictionary")
-                return 0
+                continue
 
             # Extract variables from bot's info
             location = bot_info.get("location", [0, 0])
@@ -361,4 +414,6 @@ class game_UI:
             damage_dealt = bot_info.get("damage_dealt", 0)
             meters_moved = bot_info.get("meters_moved", 0)
             total_rotation = bot_info.get("total_rotation", 0)
-            health = bot_info.get("health", 0)
\ No newline at end of file
+            health = bot_info.get("health", 0)
+
+        return changed
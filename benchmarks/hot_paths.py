@@ -0,0 +1,236 @@
+"""
+Micro-benchmarks of the geometry, simulation and bot hot paths.
+
+Runs headless on fixed, seeded worlds so that results can be compared between runs and commits:
+
+    python -m benchmarks.hot_paths                  # every benchmark
+    python -m benchmarks.hot_paths create_rays act  # only the ones whose name contains one of these
+    python -m benchmarks.hot_paths --output bench_output.txt
+
+Each benchmark reports ops/sec and per-call latency percentiles. Calls are timed in batches long enough for
+the timer overhead to be negligible, so percentiles are over batch means.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import torch
+
+from components.character import Character
+from components.my_bot import MyBot
+from components.simulation import Simulation
+from components.utils import intersection_numpy, find_hit_point_on_rectangle, distance_between_points, cast_rays
+from components.world_gen import spawn_objects
+
+
+class NullBot:
+    # Bot that never does anything, the benchmarks call the players directly
+    def act(self, info):
+        return {"forward": False, "right": False, "down": False, "left": False, "rotate": 0, "shoot": False}
+
+
+def make_world(seed=0, n_of_obstacles=25, world_size=1280):
+    """Builds a Simulation with a seeded obstacle layout and the two players of main.py."""
+    random.seed(seed)
+    simulation = Simulation(world_size, world_size, n_of_obstacles)
+    world_bounds = simulation.get_world_bounds()
+    obstacles = spawn_objects(world_bounds, simulation.max_obstacle_size, simulation.min_obstacle_size,
+                              n_of_obstacles, rng=random.Random(seed))
+    players = [
+        Character((world_bounds[2] - 100, world_bounds[3] - 100), None, boundaries=world_bounds,
+                  username="Ninja"),
+        Character((world_bounds[0] + 10, world_bounds[1] + 10), None, boundaries=world_bounds,
+                  username="Faze Jarvis")
+    ]
+    simulation.set_players_bots_objects(players, [NullBot(), NullBot()], obstacles)
+    return simulation
+
+
+def make_bot(seed=0, memory_size=5000):
+    """A MyBot on the CPU with seeded weights and a replay memory filled with seeded transitions."""
+    torch.manual_seed(seed)
+    random.seed(seed)
+    bot = MyBot(action_size=56, device="cpu")
+    generator = torch.Generator().manual_seed(seed)
+    for index in range(memory_size):
+        state = {'location': torch.rand(2, generator=generator), 'status': torch.rand(2, generator=generator),
+                 'rays': torch.rand(30, generator=generator)}
+        next_state = {'location': torch.rand(2, generator=generator), 'status': torch.rand(2, generator=generator),
+                      'rays': torch.rand(30, generator=generator)}
+        bot.memory.append(state, index % 56, float(index % 7), next_state, index % 100 == 0)
+    bot.training_started = True
+    bot.epsilon = 0.0  # always run the network in act()
+    return bot
+
+
+def measure(function, min_time=1.0, batch_time=0.002):
+    """
+    Calls function() repeatedly for at least min_time seconds.
+    :return: (ops per second, [p50, p90, p99] latency in microseconds)
+    """
+    # Calibrate the number of calls per batch
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= batch_time or calls >= 1 << 20:
+            break
+        calls *= 2
+
+    samples = []
+    total_calls = 0
+    total_time = 0.0
+    while total_time < min_time or len(samples) < 10:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / calls)
+        total_calls += calls
+        total_time += elapsed
+
+    percentiles = np.percentile(samples, [50, 90, 99]) * 1e6
+    return total_calls / total_time, percentiles
+
+
+def geometry_inputs(simulation):
+    """The segment, rectangle and ray batch the geometry benchmarks use, from the first player of a world."""
+    start = simulation.players[0].get_center()
+    end = (start[0] - 1500, start[1] - 1500)
+    rects = np.array([[o.rect.left, o.rect.top, o.rect.right, o.rect.bottom] for o in simulation.obstacles],
+                     dtype=np.float64)
+    ray_ends = np.array([[start[0] - 1500, start[1] - 1500 + 100 * index] for index in range(5)], dtype=np.float64)
+    return start, end, simulation.obstacles[0].rect, rects, ray_ends
+
+
+def intersection_benchmark(seed):
+    start, end, obstacle_rect, rects, ray_ends = geometry_inputs(make_world(seed))
+    edge = ((obstacle_rect.left, obstacle_rect.top), (obstacle_rect.left, obstacle_rect.bottom))
+    return lambda: intersection_numpy((start, end), edge)
+
+
+def hit_point_benchmark(seed):
+    start, end, obstacle_rect, rects, ray_ends = geometry_inputs(make_world(seed))
+    return lambda: find_hit_point_on_rectangle(start, end, obstacle_rect)
+
+
+def distance_benchmark(seed):
+    start, end, obstacle_rect, rects, ray_ends = geometry_inputs(make_world(seed))
+    return lambda: distance_between_points(start, end)
+
+
+def cast_rays_benchmark(seed):
+    start, end, obstacle_rect, rects, ray_ends = geometry_inputs(make_world(seed))
+    return lambda: cast_rays(start, ray_ends, rects)
+
+
+def create_rays_benchmark(seed):
+    return make_world(seed).players[0].create_rays
+
+
+def hit_scan_benchmark(seed):
+    return make_world(seed).players[0].hit_scan
+
+
+def move_benchmark(seed):
+    player = make_world(seed).players[0]
+    directions = ["forward", "right", "down", "left"]
+    move_counter = [0]
+
+    def move():
+        # cycles through the four directions so that the player stays in the same area
+        player.move_in_direction(directions[move_counter[0] % 4])
+        move_counter[0] += 1
+
+    return move
+
+
+def spawn_benchmark(seed):
+    simulation = make_world(seed)
+    spawn_rng = random.Random(seed)
+    world_bounds = simulation.get_world_bounds()
+
+    def spawn():
+        spawn_rng.seed(seed)
+        spawn_objects(world_bounds, simulation.max_obstacle_size, simulation.min_obstacle_size,
+                      simulation.n_of_obstacles, rng=spawn_rng)
+
+    return spawn
+
+
+def step_benchmark(seed):
+    return make_world(seed).step
+
+
+def normalize_state_benchmark(seed):
+    info = make_world(seed).players[0].get_info()
+    bot = make_bot(seed)
+    return lambda: bot.normalize_state(info)
+
+
+def act_benchmark(seed):
+    info = make_world(seed).players[0].get_info()
+    bot = make_bot(seed)
+    return lambda: bot.act(info)
+
+
+def replay_benchmark(seed):
+    return make_bot(seed).replay
+
+
+def memory_append_benchmark(seed):
+    # Storing one transition in the replay memory, without the training add_experience may trigger
+    info = make_world(seed).players[0].get_info()
+    bot = make_bot(seed)
+    observation = bot.normalize_state(info)
+    return lambda: bot.memory.append(observation, 0, 0.0, observation, False)
+
+
+# (name, setup): setup(seed) builds a fresh seeded world and bot and returns a function running one call of
+# the hot path, so that no benchmark runs on the state another one left behind
+BENCHMARKS = [
+    ("intersection_numpy", intersection_benchmark),
+    ("find_hit_point_on_rectangle", hit_point_benchmark),
+    ("distance_between_points", distance_benchmark),
+    ("cast_rays", cast_rays_benchmark),
+    ("create_rays", create_rays_benchmark),
+    ("hit_scan", hit_scan_benchmark),
+    ("move_in_direction", move_benchmark),
+    ("spawn_objects", spawn_benchmark),
+    ("simulation_step", step_benchmark),
+    ("normalize_state", normalize_state_benchmark),
+    ("act", act_benchmark),
+    ("replay", replay_benchmark),
+    ("memory_append", memory_append_benchmark),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help="only run the benchmarks whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the worlds and bots")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds spent on each benchmark")
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+
+    lines = ["{:<28} {:>12} {:>10} {:>10} {:>10}".format("benchmark", "ops/sec", "p50 us", "p90 us", "p99 us")]
+    print(lines[0])
+    for name, setup in BENCHMARKS:
+        if args.names and not any(part in name for part in args.names):
+            continue
+        ops, (p50, p90, p99) = measure(setup(args.seed), args.min_time)
+        lines.append("{:<28} {:>12.0f} {:>10.2f} {:>10.2f} {:>10.2f}".format(name, ops, p50, p90, p99))
+        print(lines[-1])
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
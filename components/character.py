@@ -1,16 +1,46 @@
+import math
 import time
+import numpy as np
 import pygame
-from components.utils import find_hit_point_on_rectangle, distance_between_points
+from components.utils import cast_rays, ray_end_points, ray_rect_hit, rects_to_array
+from components.player_registry import PlayerRegistry, RegistryField, RegistryRect
+from components.text_cache import TEXT_CACHE
+from components.observation import HIT_TYPE_VALUES, NUM_RAYS, RAY_FEATURES, VISION_SCALE
+from components.events import ShotEvent, ShotBlockedEvent, HitEvent, KillEvent, ReloadEvent
+from components.phase_timer import timed_phase
 
 class Character:
-    def __init__(self, starting_pos, screen, speed=5, boundaries=None, objects=None, username=None):
+    # Stats stored in the character's row of a PlayerRegistry (see components/player_registry.py)
+    rotation = RegistryField(float)
+    health = RegistryField(int)
+    current_ammo = RegistryField(int)
+    max_ammo = RegistryField(int)
+    alive = RegistryField(bool)
+    is_reloading = RegistryField(bool)
+    time_to_reload = RegistryField(float)
+    start_reloading_time = RegistryField(float, optional=True)
+    last_shoot_time = RegistryField(float, optional=True)
+    total_kills = RegistryField(int)
+    damage_dealt = RegistryField(int)
+    meters_moved = RegistryField(int)
+    total_rotation = RegistryField(float)
+
+    def __init__(self, starting_pos, screen, speed=5, boundaries=None, objects=None, username=None, registry=None):
+        # A private registry until the environment moves the character into its own (see attach_registry)
+        self.registry = registry if registry is not None else PlayerRegistry(capacity=1)
+        self.row = self.registry.allocate()
+        self._rect_view = RegistryRect(self)
+
         self.rotation = 0
         self.max_boundaries = boundaries
         self.objects = objects if objects is not None else []
+        self.obstacle_index = None  # optional SpatialGrid over self.objects, set by the environment
         self.starting_pos = starting_pos
         self.rect = pygame.Rect(starting_pos, (40, 40))
 
         self.related_bot = None
+        self.events = None  # EventBus of the environment, set by it (see components/events.py)
+        self.phase_timer = None  # PhaseTimer of the environment, set by it; times get_rays
 
         """CHARACTER STATS"""
         self.username = "player {}".format(id(self)) if username is None else username # add way to personalize
@@ -26,6 +56,14 @@ class Character:
         self.alive = True
         self.is_reloading = False
         self.rays = []
+        # self.rays as an array of unnormalized observation features, one row per ray (see create_rays)
+        self.ray_features = np.zeros((0, RAY_FEATURES))
+        self.last_shot = None  # ray of the latest shot, drawn (once) by draw()
+
+        # Rays are only re-cast when something they depend on changed (see get_rays)
+        self._ray_cache_key = None
+        self.ray_cache_hits = 0
+        self.ray_cache_misses = 0
 
         # Useful to train
         self.total_kills = 0
@@ -34,11 +72,48 @@ class Character:
         self.total_rotation = 0
 
         """TIMERS"""
+        self.clock = None  # SimClock set by the environment, the wall clock is used without one
         self.start_reloading_time = None
         self.last_shoot_time = None
 
         self.screen = screen
         self.players = []
+        # Registry rows of self.players, set with them by the environment when all players share a registry
+        self.other_player_rows = None
+
+    def attach_registry(self, registry):
+        """
+        Moves the character's stats into a new row of another registry and releases its old row.
+        The environment does this so that all its players share one registry.
+        """
+        if registry is self.registry:
+            return
+        row = registry.allocate()
+        self.registry.copy_row(self.row, registry, row)
+        self.registry.release(self.row)
+        self.registry = registry
+        self.row = row
+
+    @property
+    def rect(self):
+        # a live view of the row: player.rect.x = 500 or player.rect.move_ip(...) move the character
+        return self._rect_view
+
+    @rect.setter
+    def rect(self, rect):
+        registry, row = self.registry, self.row
+        registry.x[row] = rect.x
+        registry.y[row] = rect.y
+        registry.width[row] = rect.width
+        registry.height[row] = rect.height
+
+    def set_position(self, x, y):
+        self.registry.x[self.row] = x
+        self.registry.y[self.row] = y
+
+    def get_position(self):
+        # returns the top-left corner of the character in (x, y) format
+        return int(self.registry.x[self.row]), int(self.registry.y[self.row])
 
     "<<<<FOR USERS START>>>>"
     """GETTERS"""
@@ -65,6 +140,7 @@ class Character:
         # returns the rotation of the character in degrees
         return self.rotation
 
+    @timed_phase("rays")
     def get_rays(self):
         # returns a list of rays, each represented by a tuple of the form ((start_x, start_y), (end_x, end_y), distance, hit_type)
         # distance is None if no intersection, hit_type is "object" or "player" if intersection
@@ -75,69 +151,90 @@ class Character:
             distance = ray[1]
             hit_type = ray[2]
         """
-        self.rays = self.create_rays()
+        key = self._get_ray_cache_key()
+        if key == self._ray_cache_key:
+            self.ray_cache_hits += 1
+            return self.rays
+
+        self.ray_cache_misses += 1
+        self.ray_features = np.empty((NUM_RAYS, RAY_FEATURES))
+        self.rays = self.create_rays(features=self.ray_features)
+        self._ray_cache_key = key
         return self.rays
 
     """SETTERS"""
 
     def move_in_direction(self, direction):
-        original_pos = self.rect.topleft
-        move_x = 0
-        move_y = 0
-
         # Determine movement vector based on direction
         if direction == "forward":
-            move_y = -self.speed
+            self.move(0, -self.speed)
         elif direction == "right":
-            move_x = self.speed
+            self.move(self.speed, 0)
         elif direction == "down":
-            move_y = self.speed
+            self.move(0, self.speed)
         elif direction == "left":
-            move_x = -self.speed
-
-        # Try moving in both x and y directions independently
-        new_x = self.rect.x + move_x
-        new_y = self.rect.y + move_y
+            self.move(-self.speed, 0)
 
-        # Create temporary rects for testing each axis independently
-        temp_rect_x = self.rect.copy()
-        temp_rect_x.x = new_x
-
-        temp_rect_y = self.rect.copy()
-        temp_rect_y.y = new_y
-
-        # Check x-axis movement
-        can_move_x = True
-        if self.collision_w_objects:
-            for obj in self.objects:
-                if temp_rect_x.colliderect(obj.rect):
-                    can_move_x = False
-                    break
+    def move(self, dx, dy):
+        """
+        Moves by (dx, dy) in one go: first along x, then along y, each axis stopping against the first obstacle
+        in the way (swept AABB) and at the world boundaries, so the player slides along walls.
+        The obstacles are queried once, for the box swept by the whole move.
+        Obstacles the player already overlaps never block it.
+        """
+        registry, row = self.registry, self.row
+        x = int(registry.x[row])
+        y = int(registry.y[row])
+        width = int(registry.width[row])
+        height = int(registry.height[row])
 
-        # Check y-axis movement
-        can_move_y = True
+        nearby_rects = []
         if self.collision_w_objects:
-            for obj in self.objects:
-                if temp_rect_y.colliderect(obj.rect):
-                    can_move_y = False
-                    break
-
-        # Check boundaries for x movement
-        if not self.check_if_in_boundaries(new_x, self.rect.y):
-            can_move_x = False
-
-        # Check boundaries for y movement
-        if not self.check_if_in_boundaries(self.rect.x, new_y):
-            can_move_y = False
-
-        # Apply the allowed movements
-        if can_move_x:
-            self.rect.x = new_x
-            self.meters_moved += abs(move_x)
-
-        if can_move_y:
-            self.rect.y = new_y
-            self.meters_moved += abs(move_y)
+            swept = pygame.Rect(min(x, x + dx), min(y, y + dy), width + abs(dx), height + abs(dy))
+            if self.obstacle_index is not None:
+                nearby_objects = self.obstacle_index.query_rect(swept)
+            else:
+                nearby_objects = self.objects
+            nearby_rects = [obj.rect for obj in nearby_objects if swept.colliderect(obj.rect)]
+
+        if self.max_boundaries is not None:
+            margin = 5
+            min_x = self.max_boundaries[0] + margin
+            min_y = self.max_boundaries[1] + margin
+            max_x = self.max_boundaries[2] - margin - width
+            max_y = self.max_boundaries[3] - margin - height
+        else:
+            min_x = min_y = -math.inf
+            max_x = max_y = math.inf
+
+        # x axis, against the obstacles overlapping the player's rows
+        if dx > 0:
+            dx = max(0, min(dx, max_x - x))
+            for rect in nearby_rects:
+                if rect.top < y + height and rect.bottom > y and rect.left >= x + width:
+                    dx = min(dx, rect.left - (x + width))
+        elif dx < 0:
+            dx = min(0, max(dx, min_x - x))
+            for rect in nearby_rects:
+                if rect.top < y + height and rect.bottom > y and rect.right <= x:
+                    dx = max(dx, rect.right - x)
+        x += dx
+
+        # y axis, from the new x
+        if dy > 0:
+            dy = max(0, min(dy, max_y - y))
+            for rect in nearby_rects:
+                if rect.left < x + width and rect.right > x and rect.top >= y + height:
+                    dy = min(dy, rect.top - (y + height))
+        elif dy < 0:
+            dy = min(0, max(dy, min_y - y))
+            for rect in nearby_rects:
+                if rect.left < x + width and rect.right > x and rect.bottom <= y:
+                    dy = max(dy, rect.bottom - y)
+        y += dy
+
+        self.meters_moved += abs(dx) + abs(dy)
+        self.set_position(x, y)
 
     def add_rotate(self, degrees):
         self.rotation += degrees
@@ -145,38 +242,36 @@ class Character:
 
     def shoot(self):
         if self.current_ammo > 0:
-            if self.last_shoot_time is not None and time.time() - self.last_shoot_time < self.delay:
-                print("still on delay")
+            now = self.get_timer()
+            if self.last_shoot_time is not None and now - self.last_shoot_time < self.timer_duration(self.delay):
+                if self.events is not None and self.events.active:
+                    self.events.emit(ShotBlockedEvent(self.get_time(), self.username, "delay"))
                 return False
 
-            ray  = self.create_rays(num_rays=1, max_angle_view=1, distance=5000, damage=self.damage)[0]
-            if ray[2] == "player":
-                print("hit player, did damage", self.damage)
-                color = "red"
-            elif ray[2] == "object":
-                color = "yellow"
-            else:
-                color = "gray"
+            ray = self.hit_scan(distance=5000, damage=self.damage)
 
-                pygame.draw.line(self.screen, color, ray[0][0], ray[0][1], 5)
-            self.last_shoot_time = time.time()
+            # Only kept for drawing, the game rules never render anything
+            self.last_shot = ray
+            self.last_shoot_time = now
 
             self.current_ammo -= 1
+            if self.events is not None and self.events.active:
+                self.events.emit(ShotEvent(self.get_time(), self.username, ray[2], self.current_ammo))
+
             if self.current_ammo <= 0 and self.start_reloading_time is None:
                 self.is_reloading = True
-                print("is reloading", self.current_ammo)
+                if self.events is not None and self.events.active:
+                    self.events.emit(ReloadEvent(self.get_time(), self.username))
                 self.reload()
-            else:
-                print("is reloading (technically)")
 
         else:
-            print("no ammo")
+            if self.events is not None and self.events.active:
+                self.events.emit(ShotBlockedEvent(self.get_time(), self.username, "no_ammo"))
 
     "<<<<FOR USERS END>>>>"
     """UTILITIES"""
     def reset(self):
-        self.rect.x = self.starting_pos[0]
-        self.rect.y = self.starting_pos[1]
+        self.set_position(self.starting_pos[0], self.starting_pos[1])
         self.rotation = 0
         self.health = 100
         self.current_ammo = self.max_ammo
@@ -185,154 +280,200 @@ class Character:
         self.start_reloading_time = None
         self.last_shoot_time = None
         self.rays = []
+        self.ray_features = np.zeros((0, RAY_FEATURES))
+        self.last_shot = None
+        self.invalidate_ray_cache()
         self.total_kills = 0
         self.damage_dealt = 0
         self.meters_moved = 0
         self.total_rotation = 0
 
+    def get_time(self):
+        # time in seconds, reported in the events
+        if self.clock is not None:
+            return self.clock.now()
+        return time.time()
+
+    def get_timer(self):
+        # current time of the shooting and reloading timers (last_shoot_time, start_reloading_time): the tick of
+        # the SimClock, so that cooldowns last a whole number of ticks, or wall clock seconds without one
+        if self.clock is not None:
+            return self.clock.ticks
+        return time.time()
+
+    def timer_duration(self, seconds):
+        # a duration in the units of get_timer
+        if self.clock is not None:
+            return self.clock.seconds_to_ticks(seconds)
+        return seconds
+
+    def invalidate_ray_cache(self):
+        # Call this when the world changes (obstacles or players added, removed or replaced)
+        self._ray_cache_key = None
+
+    def _get_ray_cache_key(self):
+        # Everything the vision rays depend on, apart from the world itself
+        if self.other_player_rows is not None:
+            rows = self.other_player_rows
+            other_positions = (self.registry.x[rows].tobytes(), self.registry.y[rows].tobytes())
+        else:
+            other_positions = tuple(player.get_position() for player in self.players)
+        return (
+            self.get_position(),
+            self.rotation,
+            other_positions
+        )
+
+    def get_player_rects(self):
+        # returns the [left, top, right, bottom] rects of the other players, in the order of self.players
+        if self.other_player_rows is not None:
+            return self.registry.rects(self.other_player_rows)
+        return rects_to_array(player.rect for player in self.players)
+
     def get_center(self):
-        return self.rect.center
+        # same as self.rect.center, without building a rect
+        registry, row = self.registry, self.row
+        return (int(registry.x[row] + registry.width[row] // 2), int(registry.y[row] + registry.height[row] // 2))
 
-    def create_rays(self, num_rays=5, max_angle_view=80, distance=None, damage=0):
+    def create_rays(self, num_rays=5, max_angle_view=80, distance=None, features=None):
         # only works with odd numbers !!!!
+        # features: optional (num_rays, RAY_FEATURES) array, filled with the rays as components/observation.py
+        # encodes them before normalization: start x, start y, end x, end y, distance, hit type value
         if distance is None:
             distance = self.distance_vision
 
-        hit_distance = None
+        start = self.get_center()
+
+        # Middle point is 80/5 * (5-1)//2 --> max_angle_view/num_rays * (num_rays-1)//2
+        angles = [i - max_angle_view/num_rays * (num_rays-1)//2 + self.rotation
+                  for i in range(0, max_angle_view, max_angle_view//num_rays)]
+        end_positions = ray_end_points(start, angles, distance)
+
+        # Only the objects in the grid cells crossed by the rays can be hit
+        if self.obstacle_index is not None:
+            object_rects = self.obstacle_index.rects_along_rays(start, end_positions)
+        else:
+            object_rects = rects_to_array(object.rect for object in self.objects)
+
+        # Every ray is tested against objects, players and the world bounds in a single batch.
+        # The order matters: on equal distances the first rectangle wins, as in the old per-rectangle loop.
+        rects = [object_rects, self.get_player_rects()]
+        if self.max_boundaries is not None:
+            # The world boundaries, as [left, top, right, bottom]
+            rects.append(np.array([self.max_boundaries], dtype=np.float64))
+        hits = cast_rays(start, end_positions, np.concatenate(rects))
+        first_player = len(object_rects)
+        first_boundary = first_player + len(self.players)
+
         rays = []
-        for i in range(0, max_angle_view, max_angle_view//num_rays):
-            # Reset hit_type for each ray
-            hit_type = "none"
-
-            # Middle point is 80/5 * (5-1)//2 --> max_angle_view/num_rays * (num_rays-1)//2
-            # Calculate ray endpoint
-            direction_vector = pygame.Vector2(0, -distance).rotate(i - max_angle_view/num_rays * (num_rays-1)//2).rotate(self.rotation)
-            end_position = self.get_center() + direction_vector
-            closest_end_position = (end_position[0], end_position[1])  # Store the closest intersection point
-
-            # Check collision with each object
-            for object in self.objects:
-                point = find_hit_point_on_rectangle(self.get_center(), end_position, object.rect)
-                if point is not None:
-                    # Calculate distance to current intersection
-                    current_distance = distance_between_points(self.get_center(), point)
-                    # Calculate distance to current closest point
-                    closest_distance = distance_between_points(self.get_center(), closest_end_position)
-
-                    # Update closest point if this intersection is closer
-                    if current_distance < closest_distance:
-                        closest_end_position = (point[0], point[1])
-                        hit_type = "object"
-                        hit_distance = current_distance
-
-            for player in self.players:
-                point = find_hit_point_on_rectangle(self.get_center(), end_position, player.rect)
-                if point is not None:
-                    if damage > 0:
-                        res = player.do_damage(damage, self)
-                        if res[0]:
-                            self.total_kills += 1
-                        else:
-                            self.damage_dealt += res[1]
-                    else:
-                        #print("Saw player")
-                        None
-
-                    # Calculate distance to current intersection
-                    current_distance = distance_between_points(self.get_center(), point)
-                    # Calculate distance to current closest point
-                    closest_distance = distance_between_points(self.get_center(), closest_end_position)
-
-                    # Update closest point if this intersection is closer
-                    if current_distance < closest_distance:
-                        closest_end_position = (point[0], point[1])
-                        hit_type = "player"
-                        hit_distance = current_distance
-
-            # NEW: Check collision with world bounds.
-            if self.max_boundaries is not None:
-                # Create a rectangle representing the world boundaries.
-                world_rect = pygame.Rect(
-                    self.max_boundaries[0],
-                    self.max_boundaries[1],
-                    self.max_boundaries[2] - self.max_boundaries[0],
-                    self.max_boundaries[3] - self.max_boundaries[1]
-                )
-                boundary_point = find_hit_point_on_rectangle(self.get_center(), end_position, world_rect)
-                if boundary_point is not None:
-                    current_distance = distance_between_points(self.get_center(), boundary_point)
-                    closest_distance = distance_between_points(self.get_center(), closest_end_position)
-                    if current_distance < closest_distance:
-                        closest_end_position = (boundary_point[0], boundary_point[1])
-                        # We treat the boundary as an object (or obstacle).
-                        hit_type = "object"
-                        hit_distance = current_distance
-
-            # Add the ray with its closest intersection point (or original endpoint if no intersection)
-            rays.append([(self.get_center(), closest_end_position), hit_distance, hit_type])
+        for ray_index, end_position in enumerate(end_positions):
+            ray_hits = hits[ray_index]
+
+            closest = int(np.argmin(ray_hits)) if len(ray_hits) else 0
+            if len(ray_hits) == 0 or ray_hits[closest] == np.inf:
+                # Add the ray with its original endpoint if there is no intersection
+                rays.append([(start, (end_position[0], end_position[1])), None, "none"])
+                if features is not None:
+                    features[ray_index] = (start[0], start[1], end_position[0], end_position[1], VISION_SCALE, 0.0)
+                continue
+
+            t = ray_hits[closest]
+            closest_end_position = (start[0] + t * (end_position[0] - start[0]),
+                                    start[1] + t * (end_position[1] - start[1]))
+            # We treat the boundary as an object (or obstacle).
+            hit_type = "player" if first_player <= closest < first_boundary else "object"
+            rays.append([(start, closest_end_position), t * distance, hit_type])
+            if features is not None:
+                features[ray_index] = (start[0], start[1], closest_end_position[0], closest_end_position[1],
+                                       t * distance, HIT_TYPE_VALUES[hit_type])
 
         return rays
 
+    def hit_scan(self, distance=5000, damage=0):
+        """
+        Casts one ray straight ahead and returns its nearest hit, in the format of create_rays. Only the first
+        thing hit counts: a player behind an obstacle or behind another player is not damaged.
+        The players are tested first, then the obstacle grid is walked only up to the nearest player hit.
+        :param damage: Damage dealt to the player hit, if the nearest hit is a player
+        """
+        start = self.get_center()
+        end = ray_end_points(start, [self.rotation], distance)[0]
+        # a single ray against a handful of rects is cheaper with the scalar slab test than with NumPy
+        origin = (float(start[0]), float(start[1]))
+        direction = (float(end[0]) - origin[0], float(end[1]) - origin[1])
+        inverse = tuple(1.0 / component if component != 0 else None for component in direction)
+
+        # Nearest player, the lowest index winning on equal distances as with argmin
+        player_t, player_index = math.inf, -1
+        for index, rect in enumerate(self.get_player_rects().tolist()):
+            t = ray_rect_hit(origin, direction, inverse, rect)
+            if t < player_t:
+                player_t, player_index = t, index
+
+        # Nearest obstacle; on equal distances obstacles win over players, as in create_rays
+        if self.obstacle_index is not None:
+            object_t = self.obstacle_index.first_hit(start, end, max_t=player_t)[0]
+        else:
+            object_hits = cast_rays(start, end[None], rects_to_array(obj.rect for obj in self.objects))[0]
+            object_t = object_hits.min() if len(object_hits) else math.inf
+
+        # The world boundaries
+        boundary_t = math.inf
+        if self.max_boundaries is not None:
+            boundary_t = ray_rect_hit(origin, direction, inverse, [float(b) for b in self.max_boundaries])
+
+        if player_t < object_t and player_t <= boundary_t:
+            t, hit_type = player_t, "player"
+            if damage > 0:
+                res = self.players[player_index].do_damage(damage, self)
+                if res[0]:
+                    self.total_kills += 1
+                else:
+                    self.damage_dealt += res[1]
+        elif min(object_t, boundary_t) != math.inf:
+            t, hit_type = min(object_t, boundary_t), "object"
+        else:
+            return [(start, (end[0], end[1])), None, "none"]
+
+        hit_point = (start[0] + t * (end[0] - start[0]), start[1] + t * (end[1] - start[1]))
+        return [(start, hit_point), t * distance, hit_type]
+
     def reload(self):
+        # starts the reload timer, or refills the ammo once time_to_reload has passed (see PlayerRegistry.reload)
         if self.is_reloading:
-            if self.start_reloading_time is None:
-                self.start_reloading_time = time.time()
-            else:
-                if time.time() - self.start_reloading_time >= self.time_to_reload:
-                    self.current_ammo = self.max_ammo
-                    self.start_reloading_time = None
-                    self.is_reloading = False
+            tick_rate = self.clock.tick_rate if self.clock is not None else None
+            self.registry.reload([self.row], self.get_timer(), tick_rate)
 
     """PYGAME"""
     def do_damage(self, damage, by_player=None):
-        self.health -= damage
-        if self.health <= 0:
-            if self.alive:
-                self.alive = False
-                self.rect.x = -1000
-                self.rect.y = -1000
-                self.current_ammo = 0
-                print("player died, killer was:", by_player.username)
-                return True, damage
-            else:
-                print("player is already dead (IGNORE THIS)")
-                return False, 0
+        # dying players are moved out of the world (see PlayerRegistry.apply_damage)
+        killed, dealt = self.registry.apply_damage([self.row], damage)
+        if killed[0]:
+            if self.events is not None and self.events.active:
+                killer = by_player.username if by_player is not None else None
+                self.events.emit(HitEvent(self.get_time(), killer, self.username, damage, self.health))
+                self.events.emit(KillEvent(self.get_time(), killer, self.username))
+            return True, damage
+        elif dealt[0] == 0:
+            # the player is already dead
+            return False, 0
         else:
-            print("player took damage, current health:", self.health)
+            if self.events is not None and self.events.active:
+                attacker = by_player.username if by_player is not None else None
+                self.events.emit(HitEvent(self.get_time(), attacker, self.username, damage, self.health))
             return False, damage
 
-    def check_if_in_boundaries(self, x, y, margin=5):
-        if self.max_boundaries is None:
-            return True
-
-        # Create a temporary rect to check the new position
-        temp_rect = pygame.Rect(x, y, self.rect.width, self.rect.height)
-
-        # Add margin to the boundaries
-        boundaries_with_margin = (
-            self.max_boundaries[0] + margin,  # left
-            self.max_boundaries[1] + margin,  # top
-            self.max_boundaries[2] - margin - self.rect.width,  # right (account for rect width)
-            self.max_boundaries[3] - margin - self.rect.height  # bottom (account for rect height)
-        )
-
-        # Check if the position would be outside the boundaries
-        if (x < boundaries_with_margin[0] or
-                x > boundaries_with_margin[2] or
-                y < boundaries_with_margin[1] or
-                y > boundaries_with_margin[3]):
-            return False
-
-        return True
-
     def draw(self, screen):
+        # Returns the areas of the screen drawn over, for the dirty-rect rendering of game_UI
+        dirty = []
+
         # Draw character body
-        pygame.draw.rect(screen, "red", self.rect)
+        dirty.append(pygame.draw.rect(screen, "red", self.rect))
 
         # Draw direction indicator
         direction_vector = pygame.Vector2(0, -40).rotate(self.rotation)
         end_position = self.get_center() + direction_vector
-        pygame.draw.line(screen, "blue", self.get_center(), end_position, 5)
+        dirty.append(pygame.draw.line(screen, "blue", self.get_center(), end_position, 5))
 
         # Draw rays with different colors based on hit type
 
@@ -344,14 +485,27 @@ class Character:
             else:
                 color = "gray"
 
-            pygame.draw.line(screen, color, ray[0][0], ray[0][1], 5)
+            dirty.append(pygame.draw.line(screen, color, ray[0][0], ray[0][1], 5))
+
+        # Draw the shot fired since the last frame
+        if self.last_shot is not None:
+            if self.last_shot[2] == "player":
+                color = "red"
+            elif self.last_shot[2] == "object":
+                color = "yellow"
+            else:
+                color = "gray"
+
+            dirty.append(pygame.draw.line(screen, color, self.last_shot[0][0], self.last_shot[0][1], 5))
+            self.last_shot = None
 
         # Draw health and ammo
-        font = pygame.font.Font(None, 24)  # Default font with size 24
-        health_text = font.render(f"Health: {self.health}", True, pygame.Color("white"))
-        ammo_text = font.render(f"Ammo: {self.current_ammo}", True, pygame.Color("white"))
+        # Default font with size 24, the surfaces are cached as long as health and ammo do not change
+        health_text = TEXT_CACHE.render(f"Health: {self.health}", 24, "white")
+        ammo_text = TEXT_CACHE.render(f"Ammo: {self.current_ammo}", 24, "white")
 
         # Position the text above the character
         text_x, text_y = self.rect.topleft
-        screen.blit(health_text, (text_x, text_y - 25))  # Above the character
-        screen.blit(ammo_text, (text_x, text_y - 45))  # Even higher above the character
+        dirty.append(screen.blit(health_text, (text_x, text_y - 25)))  # Above the character
+        dirty.append(screen.blit(ammo_text, (text_x, text_y - 45)))  # Even higher above the character
+        return dirty
@@ -4,6 +4,9 @@ import math
 from components.obstacle import Obstacle
 
 class CrystalObstacle(Obstacle):
+    # Number of glow frames pre-rendered over a pulse, the glow is drawn from the frame closest to its intensity
+    pulse_frames = 24
+
     def __init__(self, pos, size):
         super().__init__(pos, size)
 
@@ -23,6 +26,12 @@ class CrystalObstacle(Obstacle):
         # Particle system
         self.particles = self._init_particles()
 
+        # Everything draw_effects draws: the glow covers the obstacle, the particles stay inside it but have a
+        # radius of up to 4 pixels
+        self.effect_rect = self.rect.inflate(10, 10)
+        self.glow_mask = None  # see set_glow_mask
+        self.glow_frames = {}  # (frame, masked) -> glow surface, the masked ones pre-rendered by set_glow_mask
+
     def _init_particles(self):
         return [(
             pygame.Vector2(
@@ -51,43 +60,73 @@ class CrystalObstacle(Obstacle):
 
         return points
 
-    def draw(self, screen):
+    def cut_out(self, coverage):
+        # Makes the pixels of the crystal transparent on a coverage surface (see set_glow_mask)
+        self._draw_crystal(coverage, (255, 255, 255, 0), (255, 255, 255, 0))
+
+    def set_glow_mask(self, coverage):
+        """
+        Keeps the glow off the crystals that are already on the screen when draw_effects draws it.
+        :param coverage: A surface in world coordinates, opaque white except where the crystals drawn over this
+            obstacle (its own and those drawn after it) were cut out. It is drawn in world coordinates because
+            pygame does not rasterize a shifted polygon to exactly the shifted pixels.
+        """
+        self.glow_mask = coverage.subsurface(self.rect).copy()
+        self.glow_frames = {}
+        self.prerender_glow(masked=True)
+
+    def prerender_glow(self, masked):
+        # Renders every glow frame of the pulse up front, so that no frame of the game renders one
+        for frame in range(self.pulse_frames):
+            self.glow_frames[(frame, masked)] = self._render_glow(frame, masked)
+
+    def _update_pulse(self):
         # Pulse animation
         self.pulse_time += self.pulse_speed
         self.glow_intensity = (math.sin(self.pulse_time) + 1) / 2  # Value between 0 and 1
 
+    def _render_glow(self, frame, masked):
         # Outer glow
         glow_surface = pygame.Surface(self.size, pygame.SRCALPHA)
         glow_radius = min(self.size[0], self.size[1]) / 1.6
         center = (self.size[0] / 2, self.size[1] / 2)
 
         # Pulsing glow effect
-        glow_alpha = int(120 * self.glow_intensity)
+        glow_alpha = int(120 * frame / (self.pulse_frames - 1))
         for radius in range(int(glow_radius), 0, -1):
             alpha = int(glow_alpha * (radius / glow_radius))
             pygame.draw.circle(glow_surface, (*self.glow_color, alpha),
                                center, radius)
 
+        if masked:
+            glow_surface.blit(self.glow_mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        if pygame.display.get_surface() is not None:
+            glow_surface = glow_surface.convert_alpha()
+        return glow_surface
+
+    def _draw_glow(self, screen, masked=False):
+        # Blits the pre-rendered glow frame closest to the current intensity. The unmasked frames, only used by
+        # draw() on screens without a static layer, are rendered on first use
+        key = (round(self.glow_intensity * (self.pulse_frames - 1)), masked)
+        glow_surface = self.glow_frames.get(key)
+        if glow_surface is None:
+            glow_surface = self.glow_frames[key] = self._render_glow(*key)
         screen.blit(glow_surface, self.pos)
 
-        # Draw crystal shape
-        if len(self.crystal_points) >= 3:
-            # Base crystal with transparency
-            crystal_alpha = int(230 + 25 * self.glow_intensity)
-            crystal_color = (*self.core_color, crystal_alpha)
-            pygame.draw.polygon(screen, crystal_color, self.crystal_points)
-
-            # Highlights
-            center = (self.pos.x + self.size[0] / 2, self.pos.y + self.size[1] / 2)
-            for i in range(len(self.crystal_points)):
-                p1 = self.crystal_points[i]
-                p2 = self.crystal_points[(i + 1) % len(self.crystal_points)]
+    def _draw_crystal(self, screen, crystal_color, accent_color):
+        if len(self.crystal_points) < 3:
+            return
+        pygame.draw.polygon(screen, crystal_color, self.crystal_points)
 
-                # Accent lines with pulsing
-                accent_alpha = int(180 * self.glow_intensity)
-                pygame.draw.line(screen, (*self.accent_color, accent_alpha), p1, p2, 2)
-                pygame.draw.line(screen, (*self.accent_color, accent_alpha), center, p1, 1)
+        # Highlights
+        center = (self.pos.x + self.size[0] / 2, self.pos.y + self.size[1] / 2)
+        for i in range(len(self.crystal_points)):
+            p1 = self.crystal_points[i]
+            p2 = self.crystal_points[(i + 1) % len(self.crystal_points)]
+            pygame.draw.line(screen, accent_color, p1, p2, 2)
+            pygame.draw.line(screen, accent_color, center, p1, 1)
 
+    def _draw_particles(self, screen):
         # Update and draw particles
         for i, (particle_pos, particle_size) in enumerate(self.particles):
             # Circular particle movement
@@ -102,4 +141,42 @@ class CrystalObstacle(Obstacle):
             # Draw particle
             particle_alpha = int(255 * self.glow_intensity)
             pygame.draw.circle(screen, (*self.accent_color, particle_alpha),
-                               particle_pos, particle_size)
\ No newline at end of file
+                               particle_pos, particle_size)
+
+    def draw_base(self, screen):
+        """
+        Draws the part of the crystal that never changes, for the static layer of game_UI.
+        The game draws on an opaque surface, where pygame ignores the alpha of the colors, so the crystal
+        itself looks the same at every point of the pulse; only its glow and particles are animated.
+        """
+        self._draw_crystal(screen, (*self.core_color, 255), (*self.accent_color, 255))
+
+    def draw_effects(self, screen):
+        """
+        Draws the animated part of the crystal (its glow, under the crystal, and its particles) over a static
+        layer that already holds draw_base.
+        :return: The area drawn, always self.effect_rect
+        """
+        if self.glow_mask is None:
+            # on its own, only the crystal of this obstacle covers its glow
+            coverage = pygame.Surface(self.rect.bottomright, pygame.SRCALPHA)
+            coverage.fill((255, 255, 255, 255))
+            self.cut_out(coverage)
+            self.set_glow_mask(coverage)
+
+        self._update_pulse()
+        self._draw_glow(screen, masked=True)
+        self._draw_particles(screen)
+        return self.effect_rect
+
+    def draw(self, screen):
+        # Draws everything, for screens without a static layer
+        self._update_pulse()
+        self._draw_glow(screen)
+
+        # Base crystal with transparency
+        crystal_alpha = int(230 + 25 * self.glow_intensity)
+        accent_alpha = int(180 * self.glow_intensity)  # Accent lines with pulsing
+        self._draw_crystal(screen, (*self.core_color, crystal_alpha), (*self.accent_color, accent_alpha))
+
+        self._draw_particles(screen)
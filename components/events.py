@@ -0,0 +1,65 @@
+from collections import deque, namedtuple
+
+# Combat events. time is the game time in seconds (see Character.get_time), players are given by username.
+ShotEvent = namedtuple("ShotEvent", ["time", "shooter", "hit_type", "ammo_left"])
+ShotBlockedEvent = namedtuple("ShotBlockedEvent", ["time", "shooter", "reason"])  # reason: "delay" or "no_ammo"
+HitEvent = namedtuple("HitEvent", ["time", "attacker", "target", "damage", "health_left"])
+KillEvent = namedtuple("KillEvent", ["time", "killer", "victim"])
+ReloadEvent = namedtuple("ReloadEvent", ["time", "player"])
+# winner is None when the episode was reset or cut short before a single player was left, or nobody survived
+EpisodeEndEvent = namedtuple("EpisodeEndEvent", ["time", "winner", "steps"])
+
+
+class EventBus:
+    """
+    Stream of the combat events of an environment, replacing the console prints of the game loop.
+    Subscribers are called with every event they subscribed to, and the latest events can be kept in a ring
+    buffer (self.history).
+
+    Emitters check self.active before building an event, so a bus nobody listens to costs one attribute
+    lookup per event:
+        if self.events is not None and self.events.active:
+            self.events.emit(ShotEvent(...))
+    """
+
+    def __init__(self, history_size=1024, record=False):
+        """
+        :param history_size: Number of events kept in self.history
+        :param record: Keep the latest events in self.history
+        """
+        self.history = deque(maxlen=history_size)
+        self.recording = record
+        self._subscribers = {}  # event type (None for all) -> callbacks
+        self.active = record
+
+    def subscribe(self, callback, event_type=None):
+        """
+        Calls callback(event) for every event of the given type, or for every event if event_type is None.
+        bus.subscribe(print) prints the events as the game used to.
+        """
+        self._subscribers.setdefault(event_type, []).append(callback)
+        self._update_active()
+
+    def unsubscribe(self, callback, event_type=None):
+        callbacks = self._subscribers.get(event_type, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        self._update_active()
+
+    def set_recording(self, record):
+        self.recording = record
+        self._update_active()
+
+    def _update_active(self):
+        self.active = self.recording or any(self._subscribers.values())
+
+    def emit(self, event):
+        if self.recording:
+            self.history.append(event)
+        for callback in self._subscribers.get(type(event), ()):
+            callback(event)
+        for callback in self._subscribers.get(None, ()):
+            callback(event)
+
+    def clear(self):
+        self.history.clear()
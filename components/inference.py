@@ -0,0 +1,78 @@
+"""
+Inference export for ImprovedDQN.
+
+Freezes a trained checkpoint (bot_model_*.pth, as saved by MyBot.save) into a TorchScript module that takes
+the flat normalized observation (see components/observation.py) instead of a dict of tensors, optionally
+with its Linear layers dynamically quantized to int8. MyBot.load_inference loads such a module for a fast,
+CPU-friendly act().
+"""
+import torch
+import torch.nn as nn
+
+from components.my_bot import ImprovedDQN
+from components.observation import OBSERVATION_SIZE
+
+
+class FlatDQN(nn.Module):
+    """ImprovedDQN with a single (batch, OBSERVATION_SIZE) input, as laid out by MyBot.normalize_state."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, observations):
+        loc = self.model.location_net(observations[:, 0:2])
+        status = self.model.status_net(observations[:, 2:4])
+        rays = self.model.ray_net(observations[:, 4:OBSERVATION_SIZE])
+        return self.model.combined_net(torch.cat([loc, status, rays], dim=1))
+
+
+def load_checkpoint_model(checkpoint_path):
+    """Builds an ImprovedDQN on the CPU from a MyBot checkpoint, with its action size read from the weights."""
+    checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    state_dict = checkpoint['model_state_dict']
+    action_size = state_dict['combined_net.4.weight'].shape[0]
+    model = ImprovedDQN(input_dim=OBSERVATION_SIZE, output_dim=action_size)
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def export_inference_model(checkpoint_path, output_path=None, quantize=False):
+    """
+    Freezes a MyBot checkpoint into a TorchScript module for CPU inference.
+
+    :param checkpoint_path: The checkpoint saved by MyBot.save
+    :param output_path: Where to save the module (torch.jit.save), not saved if None
+    :param quantize: Quantize the Linear layers to int8 (dynamic quantization), smaller and usually faster on
+        CPU at a small cost in precision
+    :return: The frozen module
+    """
+    model = FlatDQN(load_checkpoint_model(checkpoint_path)).eval()
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.zeros(1, OBSERVATION_SIZE))
+    frozen = torch.jit.freeze(traced)
+
+    if output_path is not None:
+        torch.jit.save(frozen, output_path)
+    return frozen
+
+
+def load_inference_model(path):
+    """Loads a module saved by export_inference_model, on the CPU."""
+    return torch.jit.load(path, map_location="cpu").eval()
+
+
+def main():
+    # Export the models trained by main.py
+    for idx in range(2):
+        checkpoint_path = f"bot_model_{idx}.pth"
+        export_inference_model(checkpoint_path, f"bot_model_{idx}.pt")
+        export_inference_model(checkpoint_path, f"bot_model_{idx}_int8.pt", quantize=True)
+        print(f"Exported {checkpoint_path} to bot_model_{idx}.pt and bot_model_{idx}_int8.pt")
+
+
+if __name__ == "__main__":
+    main()
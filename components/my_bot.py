@@ -3,8 +3,13 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import numpy as np
-from collections import deque
+import copy
 import random
+import threading
+import time
+from components.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from components.training_schedule import TrainingSchedule
+from components.observation import encode_info
 
 
 class ImprovedDQN(nn.Module):
@@ -55,26 +60,59 @@ class ImprovedDQN(nn.Module):
 
 
 class MyBot:
-    def __init__(self, action_size=16):  # Increased action space
+    def __init__(self, action_size=16, device=None, prioritized_replay=False, async_training=False,
+                 weight_sync_interval=100, schedule=None, memory_capacity=100000):  # Increased action space
+        """
+        :param prioritized_replay: Sample the replay memory by TD error instead of uniformly
+        :param async_training: Train in a background learner thread instead of inside remember(), so that
+            stepping the environment never waits for backprop. act() then uses a copy of the model
+        :param weight_sync_interval: In async mode, number of learner updates between two copies of the
+            trained weights into the acting model
+        :param schedule: The TrainingSchedule (updates per step, warmup, target syncs), one update per step
+            after 1000 transitions and a target sync every 1000 steps by default
+        :param memory_capacity: Number of transitions the replay memory keeps (about 29 MB per 100000, allocated
+            up front). 0 builds a bot that only acts, without a replay memory (e.g. the parallel trainer's
+            rollout workers)
+        """
+        if async_training and not memory_capacity:
+            raise ValueError("async_training needs a replay memory, memory_capacity must be at least 1")
+
         self.action_size = action_size
-        self.memory = deque(maxlen=100000)  # Increased memory size
         self.gamma = 0.99
         self.epsilon = 1.0
         self.epsilon_min = 0.05  # Lower minimum exploration
         self.epsilon_decay = 0.9995  # Slower decay
         self.learning_rate = 0.0003  # Reduced learning rate
         self.batch_size = 32  # Reduced batch size for faster initial learning
-        self.min_memory_size = 1000  # Minimum memory size before starting training
-        self.update_target_freq = 1000  # How often to update target network
+        self.schedule = schedule if schedule is not None else TrainingSchedule(
+            train_every=1,
+            gradient_steps=1,
+            warmup=1000,  # Minimum memory size before starting training
+            update_target_freq=1000  # How often to update target network
+        )
         self.steps = 0
+        self.training_start_step = 0
 
-        # Device selection
-        self.device = torch.device("cuda" if torch.cuda.is_available() else
-                                   "mps" if torch.backends.mps.is_available() else
-                                   "cpu")
+        # Device selection (can be forced, e.g. to "cpu" in rollout worker processes)
+        if device is not None:
+            self.device = torch.device(device)
+        else:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else
+                                       "mps" if torch.backends.mps.is_available() else
+                                       "cpu")
 
         print(f"Using device: {self.device}")
 
+        # Replay memory, kept on the CPU; sampled batches are moved to self.device.
+        # With prioritized_replay, transitions with large TD errors (kills, damage) are replayed more often.
+        self.prioritized_replay = prioritized_replay
+        if not memory_capacity:
+            self.memory = None
+        elif prioritized_replay:
+            self.memory = PrioritizedReplayBuffer(capacity=memory_capacity)
+        else:
+            self.memory = ReplayBuffer(capacity=memory_capacity)
+
         # Create two networks - one for current Q-values and one for target
         self.model = ImprovedDQN(input_dim=34, output_dim=action_size).to(self.device)
         self.target_model = ImprovedDQN(input_dim=34, output_dim=action_size).to(self.device)
@@ -88,8 +126,59 @@ class MyBot:
         self.last_action = None
         self.training_started = False
 
+        # Frozen module from components/inference.py, see load_inference
+        self.inference_model = None
+
+        # Locks shared by the environment thread and the learner thread (uncontended when not async)
+        self.memory_lock = threading.Lock()  # self.memory
+        self.training_lock = threading.Lock()  # self.model, self.target_model and self.optimizer
+        self.acting_lock = threading.Lock()  # self.acting_model
+
+        self.async_training = async_training
+        self.weight_sync_interval = weight_sync_interval
+        self.learner_updates = 0
+        self.learner_thread = None
+        self._stop_learner = threading.Event()
+        self._acting_model = None
+        if async_training:
+            self._acting_model = copy.deepcopy(self.model)
+            self.start_learner()
+
+    @property
+    def acting_model(self):
+        # The network act() uses: self.model, or in async mode a copy refreshed by the learner thread
+        return self._acting_model if self.async_training else self.model
+
+    @property
+    def min_memory_size(self):
+        # Minimum memory size before starting training, kept by the schedule as its warmup
+        return self.schedule.warmup
+
+    @min_memory_size.setter
+    def min_memory_size(self, value):
+        self.schedule.warmup = value
+
+    @property
+    def update_target_freq(self):
+        # How often to update target network, kept by the schedule
+        return self.schedule.update_target_freq
+
+    @update_target_freq.setter
+    def update_target_freq(self, value):
+        self.schedule.update_target_freq = value
+
     def normalize_state(self, info):
         """Normalize state values to improve learning stability"""
+        if isinstance(info, np.ndarray):
+            # Already normalized by the environment (obs_mode="array"). Copied, since the environment
+            # overwrites its observation buffer at every step and the state may be kept in memory.
+            observation = torch.tensor(info, dtype=torch.float32)
+            return {
+                'location': observation[0:2],
+                'status': observation[2:4],
+                'rays': observation[4:34]
+            }
+
         try:
             state = {
                 'location': torch.tensor([
@@ -168,8 +257,17 @@ class MyBot:
 
         return commands
 
+    def flat_observation(self, info):
+        # the normalized state as one float32 tensor of 34 values, the input of an exported inference module
+        if isinstance(info, np.ndarray):
+            return torch.from_numpy(np.asarray(info, dtype=np.float32))
+        return torch.from_numpy(encode_info(info))
+
     def act(self, info):
         try:
+            if self.inference_model is not None:
+                return self._act_inference(info)
+
             state = self.normalize_state(info)
 
             # Convert state dict to tensors and add batch dimension
@@ -180,8 +278,8 @@ class MyBot:
             if random.random() <= self.epsilon:
                 action = random.randrange(self.action_size)
             else:
-                with torch.no_grad():
-                    q_values = self.model(state_tensors)
+                with torch.no_grad(), self.acting_lock:
+                    q_values = self.acting_model(state_tensors)
                     action = torch.argmax(q_values).item()
 
             self.last_state = state
@@ -193,103 +291,307 @@ class MyBot:
             # Return safe default action
             return {"forward": False, "right": False, "down": False, "left": False, "rotate": 0, "shoot": False}
 
+    def _act_inference(self, info):
+        # act() with the exported module: no dict of tensors, no device transfer
+        observation = self.flat_observation(info).unsqueeze(0)
+
+        if random.random() <= self.epsilon:
+            action = random.randrange(self.action_size)
+        else:
+            with torch.no_grad():
+                action = int(torch.argmax(self.inference_model(observation)))
+
+        self.last_state = None
+        self.last_action = action
+        return self.action_to_dict(action)
+
+    @staticmethod
+    def act_batch(bots, infos):
+        """
+        act() for several bots at once: one forward pass per model instead of one per bot.
+        Bots that share a model object (bot.model) are batched together. Exploration is decided per bot,
+        in order, exactly as act() does.
+
+        :param bots: The MyBot of every player
+        :param infos: What each bot would receive in act() (an info dictionary or an observation array)
+        :return: The action dictionary of every bot, in the same order
+        """
+        try:
+            states = []
+            greedy = {}  # id(acting model or inference module) -> indices of the bots that use it this step
+            for index, (bot, info) in enumerate(zip(bots, infos)):
+                if bot.inference_model is not None:
+                    state = bot.flat_observation(info)
+                    bot.last_state = None
+                    model = bot.inference_model
+                else:
+                    state = bot.normalize_state(info)
+                    bot.last_state = state
+                    model = bot.acting_model
+                states.append(state)
+                if random.random() <= bot.epsilon:
+                    bot.last_action = random.randrange(bot.action_size)
+                else:
+                    greedy.setdefault(id(model), []).append(index)
+
+            for indices in greedy.values():
+                first = bots[indices[0]]
+                with torch.no_grad():
+                    if first.inference_model is not None:
+                        q_values = first.inference_model(torch.stack([states[index] for index in indices]))
+                    else:
+                        state_tensors = {
+                            k: torch.stack([states[index][k] for index in indices]).to(first.device)
+                            for k in states[indices[0]]
+                        }
+                        with first.acting_lock:
+                            q_values = first.acting_model(state_tensors)
+                for index, action in zip(indices, torch.argmax(q_values, dim=1).tolist()):
+                    bots[index].last_action = action
+
+            return [bot.action_to_dict(bot.last_action) for bot in bots]
+
+        except Exception as e:
+            print(f"Error in act_batch: {e}")
+            # Return safe default actions
+            return [{"forward": False, "right": False, "down": False, "left": False, "rotate": 0, "shoot": False}
+                    for _ in bots]
+
     def remember(self, reward, next_info, done):
+        if self.inference_model is not None:
+            return  # an exported module cannot be trained
+
         try:
             next_state = self.normalize_state(next_info)
-            self.memory.append((self.last_state, self.last_action, reward, next_state, done))
+            self.add_experience(self.last_state, self.last_action, reward, next_state, done)
+
+        except Exception as e:
+            print(f"Error in remember: {e}")
+
+    def add_experience(self, state, action, reward, next_state, done):
+        """Stores a transition and runs the learning that follows it (also used by the parallel trainer)"""
+        if self.memory is None:
+            raise ValueError("This bot has no replay memory (memory_capacity=0)")
+        try:
+            with self.memory_lock:
+                self.memory.append(state, action, reward, next_state, done)
+
+            self.steps += 1
 
             # Start training only when we have enough samples
-            if len(self.memory) >= self.min_memory_size and not self.training_started:
+            if not self.training_started and self.schedule.is_warm(len(self.memory)):
                 print(f"Starting training with {len(self.memory)} samples in memory")
                 self.training_started = True
+                self.training_start_step = self.steps
+
+            # The learner thread trains and syncs the target network in async mode
+            if self.async_training:
+                return
 
-            # Perform learning step if we have enough samples
             if self.training_started:
-                self.replay()
+                for _ in range(self.schedule.updates_due(self.steps)):
+                    self.replay()
 
             # Update target network periodically
-            self.steps += 1
-            if self.steps % self.update_target_freq == 0:
-                self.target_model.load_state_dict(self.model.state_dict())
-                print(f"Updated target network at step {self.steps}")
+            if self.schedule.target_sync_due(self.steps):
+                self.update_target_model()
 
         except Exception as e:
-            print(f"Error in remember: {e}")
-
-    def replay(self):
-        """Safe replay function that checks memory size"""
-        if len(self.memory) < self.batch_size:
+            print(f"Error in add_experience: {e}")
+
+    def add_experiences(self, transitions):
+        """
+        Stores a chunk of (state, action, reward, next_state, done) transitions, then runs the updates and target
+        syncs the schedule gives for that many steps in one go (used by the parallel trainer's learner)
+        """
+        if not transitions:
             return
-
+        if self.memory is None:
+            raise ValueError("This bot has no replay memory (memory_capacity=0)")
         try:
-            minibatch = random.sample(self.memory, self.batch_size)
+            with self.memory_lock:
+                for state, action, reward, next_state, done in transitions:
+                    self.memory.append(state, action, reward, next_state, done)
 
-            # Prepare batch data
-            states = {
-                'location': torch.stack([t[0]['location'] for t in minibatch]).to(self.device),
-                'status': torch.stack([t[0]['status'] for t in minibatch]).to(self.device),
-                'rays': torch.stack([t[0]['rays'] for t in minibatch]).to(self.device)
-            }
+            previous = self.steps
+            self.steps += len(transitions)
 
-            next_states = {
-                'location': torch.stack([t[3]['location'] for t in minibatch]).to(self.device),
-                'status': torch.stack([t[3]['status'] for t in minibatch]).to(self.device),
-                'rays': torch.stack([t[3]['rays'] for t in minibatch]).to(self.device)
-            }
+            if not self.training_started and self.schedule.is_warm(len(self.memory)):
+                print(f"Starting training with {len(self.memory)} samples in memory")
+                self.training_started = True
+                self.training_start_step = self.steps
 
-            actions = torch.tensor([t[1] for t in minibatch], dtype=torch.long).to(self.device)
-            rewards = torch.tensor([t[2] for t in minibatch], dtype=torch.float32).to(self.device)
-            dones = torch.tensor([t[4] for t in minibatch], dtype=torch.float32).to(self.device)
+            if self.async_training:
+                return
 
-            # Get current Q values
-            current_q_values = self.model(states).gather(1, actions.unsqueeze(1))
+            if self.training_started:
+                start = max(previous, self.training_start_step)
+                for _ in range(self.schedule.total_updates_due(start, self.steps)):
+                    self.replay()
 
-            # Get next Q values from target network
-            with torch.no_grad():
-                next_q_values = self.target_model(next_states).max(1)[0]
-                target_q_values = rewards + (1 - dones) * self.gamma * next_q_values
+            # One sync when the chunk crosses one or more update_target_freq boundaries
+            freq = self.schedule.update_target_freq
+            if self.steps // freq > previous // freq:
+                self.update_target_model()
 
-            # Compute loss and optimize
-            loss = F.smooth_l1_loss(current_q_values.squeeze(), target_q_values)
+        except Exception as e:
+            print(f"Error in add_experiences: {e}")
 
-            self.optimizer.zero_grad()
-            loss.backward()
-            torch.nn.utils.clip_grad_norm_(self.model.parameters(), 1.0)  # Gradient clipping
-            self.optimizer.step()
+    def replay(self):
+        """Safe replay function that checks memory size"""
+        if self.memory is None or len(self.memory) < self.batch_size or not self.schedule.is_warm(len(self.memory)):
+            return
 
-            # Decay epsilon
-            self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
+        try:
+            with self.memory_lock:
+                if self.prioritized_replay:
+                    indices, weights = self.memory.sample_with_weights(self.batch_size)
+                else:
+                    indices, weights = self.memory.sample_indices(self.batch_size), None
+                states, actions, rewards, next_states, dones = self.memory.gather(indices)
+            with self.training_lock:
+                self._train_on_batch(states, actions, rewards, next_states, dones, indices, weights)
 
         except Exception as e:
             print(f"Error in replay: {e}")
 
+    def _train_on_batch(self, states, actions, rewards, next_states, dones, indices, weights):
+        """One gradient step on a batch sampled by replay()"""
+        # Move the batch to the training device
+        states = {k: v.to(self.device) for k, v in states.items()}
+        next_states = {k: v.to(self.device) for k, v in next_states.items()}
+        actions = actions.to(self.device)
+        rewards = rewards.to(self.device)
+        dones = dones.to(self.device)
+
+        # Get current Q values
+        current_q_values = self.model(states).gather(1, actions.unsqueeze(1))
+
+        # Get next Q values from target network
+        with torch.no_grad():
+            next_q_values = self.target_model(next_states).max(1)[0]
+            target_q_values = rewards + (1 - dones) * self.gamma * next_q_values
+
+        # Compute loss and optimize
+        if weights is None:
+            loss = F.smooth_l1_loss(current_q_values.squeeze(), target_q_values)
+        else:
+            # Importance-sampling weights undo the bias of the prioritized sampling
+            losses = F.smooth_l1_loss(current_q_values.squeeze(1), target_q_values, reduction='none')
+            loss = (weights.to(self.device) * losses).mean()
+            with self.memory_lock:
+                self.memory.update_priorities(indices, current_q_values.squeeze(1) - target_q_values)
+
+        self.optimizer.zero_grad()
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(self.model.parameters(), 1.0)  # Gradient clipping
+        self.optimizer.step()
+
+        # Decay epsilon
+        self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
+
+    def update_target_model(self):
+        """Syncs the target network with the trained one, following the schedule's target_update_tau"""
+        tau = self.schedule.target_update_tau
+        with self.training_lock:
+            if tau >= 1:
+                self.target_model.load_state_dict(self.model.state_dict())
+            else:
+                with torch.no_grad():
+                    for target_param, param in zip(self.target_model.parameters(), self.model.parameters()):
+                        target_param.lerp_(param, tau)
+        print(f"Updated target network at step {self.steps}")
+
+    """ASYNC TRAINING"""
+    def start_learner(self):
+        """Starts the background learner thread (async mode)"""
+        if self.learner_thread is not None and self.learner_thread.is_alive():
+            return
+        self._stop_learner.clear()
+        self.learner_thread = threading.Thread(target=self._learner_loop, name="MyBot learner", daemon=True)
+        self.learner_thread.start()
+
+    def stop_learner(self):
+        """Stops the learner thread after its current update and copies the latest weights to the acting model"""
+        if self.learner_thread is None:
+            return
+        self._stop_learner.set()
+        self.learner_thread.join()
+        self.learner_thread = None
+        self.sync_acting_model()
+
+    def sync_acting_model(self):
+        # Copies the trained weights into the network act() uses
+        if not self.async_training:
+            return
+        with self.training_lock:
+            weights = {k: v.clone() for k, v in self.model.state_dict().items()}
+        with self.acting_lock:
+            self._acting_model.load_state_dict(weights)
+
+    def _learner_loop(self):
+        # Trains on the replay memory while the environment keeps stepping, at the schedule's updates-per-step
+        # ratio: it waits for new steps when it is ahead, and catches up as fast as it can when it is behind
+        target_syncs = self.steps // self.schedule.update_target_freq
+        updates = 0
+        while not self._stop_learner.is_set():
+            due = self.schedule.total_updates_due(self.training_start_step, self.steps) if self.training_started else 0
+            if updates >= due or len(self.memory) < self.batch_size:
+                time.sleep(0.001)
+                continue
+
+            self.replay()
+            updates += 1
+            self.learner_updates += 1
+            if self.learner_updates % self.weight_sync_interval == 0:
+                self.sync_acting_model()
+
+            # Update target network every update_target_freq environment steps, as in add_experience
+            if self.steps // self.schedule.update_target_freq != target_syncs:
+                target_syncs = self.steps // self.schedule.update_target_freq
+                self.update_target_model()
+
     def save(self, filepath):
         """Saves the model weights."""
         try:
-            torch.save({
-                'model_state_dict': self.model.state_dict(),
-                'optimizer_state_dict': self.optimizer.state_dict(),
-                'epsilon': self.epsilon,
-                'steps': self.steps
-            }, filepath)
+            with self.training_lock:
+                torch.save({
+                    'model_state_dict': self.model.state_dict(),
+                    'optimizer_state_dict': self.optimizer.state_dict(),
+                    'epsilon': self.epsilon,
+                    'steps': self.steps
+                }, filepath)
             print(f"Model saved successfully to {filepath}")
         except Exception as e:
             print(f"Error saving model: {e}")
 
     def load(self, filepath):
         """Loads model weights from the specified file."""
-        try:
-            checkpoint = torch.load(filepath, map_location=self.device)
-            self.model.load_state_dict(checkpoint['model_state_dict'])
-            self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
-            self.epsilon = checkpoint['epsilon']
-            self.steps = checkpoint['steps']
-            self.model.to(self.device)
-            print(f"Model loaded successfully from {filepath}")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            print("Starting with a fresh model")
-            # Initialize a fresh model if loading fails
-            self.model = ImprovedDQN(input_dim=34, output_dim=self.action_size).to(self.device)
-            self.target_model = ImprovedDQN(input_dim=34, output_dim=self.action_size).to(self.device)
-            self.target_model.load_state_dict(self.model.state_dict())
\ No newline at end of file
+        with self.training_lock:
+            try:
+                checkpoint = torch.load(filepath, map_location=self.device)
+                self.model.load_state_dict(checkpoint['model_state_dict'])
+                self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+                self.epsilon = checkpoint['epsilon']
+                self.steps = checkpoint['steps']
+                self.model.to(self.device)
+                print(f"Model loaded successfully from {filepath}")
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                print("Starting with a fresh model")
+                # Initialize a fresh model if loading fails
+                self.model = ImprovedDQN(input_dim=34, output_dim=self.action_size).to(self.device)
+                self.target_model = ImprovedDQN(input_dim=34, output_dim=self.action_size).to(self.device)
+                self.target_model.load_state_dict(self.model.state_dict())
+        self.sync_acting_model()
+
+    def load_inference(self, filepath, epsilon=0.0):
+        """
+        Plays with a module exported by components/inference.py (export_inference_model) instead of self.model.
+        act() then runs the frozen, optionally int8, module on the CPU and the bot stops learning.
+        :param epsilon: Exploration rate to play with, greedy by default
+        """
+        from components.inference import load_inference_model
+        self.inference_model = load_inference_model(filepath)
+        self.epsilon = epsilon
+        print(f"Inference model loaded from {filepath}")
@@ -0,0 +1,76 @@
+import numpy as np
+
+# Normalization of MyBot.normalize_state
+WORLD_SCALE = 1280.0
+VISION_SCALE = 1500.0
+ROTATION_SCALE = 360.0
+MAX_AMMO_SCALE = 30.0
+
+NUM_RAYS = 5
+RAY_FEATURES = 6  # start x, start y, end x, end y, distance, hit type
+OBSERVATION_SIZE = 4 + NUM_RAYS * RAY_FEATURES  # 2 location + 2 status + 5 rays * 6 features
+
+HIT_TYPE_VALUES = {"player": 1.0, "object": 0.5}
+
+# Normalization of the columns of Character.ray_features
+RAY_SCALES = np.array([WORLD_SCALE, WORLD_SCALE, WORLD_SCALE, WORLD_SCALE, VISION_SCALE, 1.0])
+
+
+def encode_info(info, out=None):
+    """
+    Writes the normalized observation of one player into a float32 array, with the same layout and values as
+    MyBot.normalize_state: location (2), rotation and ammo (2), then 6 features per ray, zero padded.
+
+    :param info: The dictionary returned by Character.get_info
+    :param out: Array of OBSERVATION_SIZE floats to write into, a new one is created if None
+    :return: out
+    """
+    if out is None:
+        out = np.empty(OBSERVATION_SIZE, dtype=np.float32)
+
+    location = info['location']
+    out[0] = location[0] / WORLD_SCALE
+    out[1] = location[1] / WORLD_SCALE
+    out[2] = info['rotation'] / ROTATION_SCALE
+    out[3] = info['current_ammo'] / MAX_AMMO_SCALE
+
+    index = 4
+    for ray in info.get('rays', []):
+        if index == OBSERVATION_SIZE:
+            break
+        if not (isinstance(ray, list) and len(ray) == 3):
+            continue
+        start_pos, end_pos = ray[0]
+        distance = ray[1] if ray[1] is not None else VISION_SCALE
+        out[index] = start_pos[0] / WORLD_SCALE
+        out[index + 1] = start_pos[1] / WORLD_SCALE
+        out[index + 2] = end_pos[0] / WORLD_SCALE
+        out[index + 3] = end_pos[1] / WORLD_SCALE
+        out[index + 4] = distance / VISION_SCALE
+        out[index + 5] = HIT_TYPE_VALUES.get(ray[2], 0.0)
+        index += RAY_FEATURES
+
+    out[index:] = 0.0
+    return out
+
+
+def encode_observations(registry, rows, ray_features, out):
+    """
+    Writes the observations of several players into out, with the same values as encode_info, but straight
+    from their PlayerRegistry columns and ray arrays instead of get_info dictionaries.
+
+    :param registry: The PlayerRegistry of the players
+    :param rows: Their rows in the registry
+    :param ray_features: Their Character.ray_features, in the same order
+    :param out: Array of shape (len(rows), OBSERVATION_SIZE) to write into
+    :return: out
+    """
+    out[:, 0:2] = registry.centers(rows) / WORLD_SCALE
+    out[:, 2] = registry.rotation[rows] / ROTATION_SCALE
+    out[:, 3] = registry.current_ammo[rows] / MAX_AMMO_SCALE
+
+    for index, features in enumerate(ray_features):
+        end = 4 + min(len(features), NUM_RAYS) * RAY_FEATURES
+        out[index, 4:end] = (features[:NUM_RAYS] / RAY_SCALES).ravel()
+        out[index, end:] = 0.0
+    return out
@@ -0,0 +1,105 @@
+import functools
+import time
+
+
+class PhaseTimer:
+    """
+    Aggregates where the time of the game loop goes, phase by phase (bot act, movement, rays, ...).
+    The loop calls begin() once and then lap(phase) after each phase, which charges the time since the
+    previous lap to that phase, and end_step() once everything of the step (rendering included) is charged.
+    Methods decorated with timed_phase are charged to their own phase wherever they are called, and their
+    time is left out of the lap they ran in. Disabled, every call returns right away.
+    """
+
+    def __init__(self, enabled=False, report_every=0):
+        """
+        :param enabled: Measure from the start
+        :param report_every: Print a summary every this many steps (0 never prints)
+        """
+        self.enabled = enabled
+        self.report_every = report_every
+        self.totals = {}  # phase -> seconds
+        self.calls = {}  # phase -> number of laps
+        self.maxima = {}  # phase -> longest lap in seconds
+        self.steps = 0
+        self._last = 0.0
+        self._excluded = 0.0  # time of timed_phase methods since the last lap
+
+    def reset(self):
+        self.totals = {}
+        self.calls = {}
+        self.maxima = {}
+        self.steps = 0
+
+    def begin(self):
+        if self.enabled:
+            self._last = time.perf_counter()
+            self._excluded = 0.0
+
+    def lap(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.add(phase, now - self._last - self._excluded)
+        self._last = now
+        self._excluded = 0.0
+
+    def add(self, phase, seconds):
+        # charges a duration measured elsewhere to a phase
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        if seconds > self.maxima.get(phase, 0.0):
+            self.maxima[phase] = seconds
+
+    def end_step(self):
+        if not self.enabled:
+            return
+        self.steps += 1
+        if self.report_every and self.steps % self.report_every == 0:
+            print(self.summary())
+
+    def stats(self):
+        """
+        Returns, for every phase: the total time in seconds, the number of laps, the mean time per step and
+        the longest lap in milliseconds, and its share of the time of all phases.
+        """
+        measured = sum(self.totals.values())
+        return {
+            phase: {
+                "total": total,
+                "calls": self.calls[phase],
+                "per_step_ms": total / self.steps * 1000 if self.steps else 0.0,
+                "max_ms": self.maxima[phase] * 1000,
+                "share": total / measured if measured else 0.0
+            }
+            for phase, total in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+
+    def summary(self):
+        lines = ["Phase timings over {} steps:".format(self.steps)]
+        for phase, phase_stats in self.stats().items():
+            lines.append("  {:<12} {:8.3f} ms/step  {:5.1f}%  max {:7.3f} ms".format(
+                phase, phase_stats["per_step_ms"], phase_stats["share"] * 100, phase_stats["max_ms"]))
+        return "\n".join(lines)
+
+
+def timed_phase(phase):
+    """
+    Decorator charging the time of a method to a phase of self.phase_timer (which may be None), instead of to
+    the lap the method is called in.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timer = self.phase_timer
+            if timer is None or not timer.enabled:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                timer.add(phase, elapsed)
+                timer._excluded += elapsed
+        return wrapper
+    return decorator
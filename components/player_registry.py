@@ -0,0 +1,252 @@
+import numpy as np
+import pygame
+
+
+class PlayerRegistry:
+    """
+    Struct-of-arrays store for player state: one contiguous NumPy column per stat, one row per player.
+    Each Character is a thin view into its row, and consumers that handle many players can work on whole
+    columns at once (reload, damage, info export) instead of walking Character objects one by one.
+
+    Timers that can be None on a Character are stored as NaN.
+    """
+
+    COLUMNS = (
+        ("x", np.int64),
+        ("y", np.int64),
+        ("width", np.int64),
+        ("height", np.int64),
+        ("rotation", np.float64),
+        ("health", np.int64),
+        ("current_ammo", np.int64),
+        ("max_ammo", np.int64),
+        ("alive", np.bool_),
+        ("is_reloading", np.bool_),
+        ("time_to_reload", np.float64),
+        ("start_reloading_time", np.float64),
+        ("last_shoot_time", np.float64),
+        ("total_kills", np.int64),
+        ("damage_dealt", np.int64),
+        ("meters_moved", np.int64),
+        ("total_rotation", np.float64),
+    )
+
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self.size = 0  # rows handed out so far (including released ones)
+        self._free_rows = []
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def allocate(self):
+        """Returns the index of a new, zeroed row."""
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow(self.capacity * 2)
+            row = self.size
+            self.size += 1
+
+        for name, dtype in self.COLUMNS:
+            getattr(self, name)[row] = 0
+        return row
+
+    def release(self, row):
+        # the row is handed out again by a later allocate(); only the owner of the row should release it
+        self._free_rows.append(row)
+
+    def copy_row(self, row, other, other_row):
+        # copies every stat of row into other_row of another registry
+        for name, dtype in self.COLUMNS:
+            getattr(other, name)[other_row] = getattr(self, name)[row]
+
+    def _grow(self, capacity):
+        # Columns are replaced, so never keep a reference to one across allocations
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self.capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    """BULK OPERATIONS"""
+    def centers(self, rows):
+        # returns the (x, y) centers of the given rows, shape (len(rows), 2)
+        rows = np.asarray(rows, dtype=np.int64)
+        return np.stack((self.x[rows] + self.width[rows] // 2, self.y[rows] + self.height[rows] // 2), axis=-1)
+
+    def rects(self, rows):
+        # returns the [left, top, right, bottom] rect of the given rows as floats, shape (len(rows), 4)
+        rects = np.empty((len(rows), 4), dtype=np.float64)
+        rects[:, 0] = self.x[rows]
+        rects[:, 1] = self.y[rows]
+        rects[:, 2] = rects[:, 0] + self.width[rows]
+        rects[:, 3] = rects[:, 1] + self.height[rows]
+        return rects
+
+    def reload(self, rows, now, tick_rate=None):
+        """
+        Character.reload for every given row.
+        :param now: The current tick if tick_rate is given (time_to_reload is then rounded to whole ticks, as
+            SimClock.seconds_to_ticks does), the current time in seconds otherwise
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self.is_reloading[rows]]
+        if len(rows) == 0:
+            return
+
+        starting = np.isnan(self.start_reloading_time[rows])
+        self.start_reloading_time[rows[starting]] = now
+
+        waiting = rows[~starting]
+        durations = self.time_to_reload[waiting]
+        if tick_rate is not None:
+            durations = np.rint(durations * tick_rate)
+        done = waiting[now - self.start_reloading_time[waiting] >= durations]
+        self.current_ammo[done] = self.max_ammo[done]
+        self.start_reloading_time[done] = np.nan
+        self.is_reloading[done] = False
+
+    def apply_damage(self, rows, damage):
+        """
+        Character.do_damage for every given row.
+        :return: (killed, dealt) arrays: whether each row was killed by this damage and the damage that counts
+            towards the attacker's damage_dealt (0 for players that were already dead)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self.health[rows] -= damage
+        dying = self.health[rows] <= 0
+        killed = dying & self.alive[rows]
+
+        dead_rows = rows[killed]
+        self.alive[dead_rows] = False
+        self.x[dead_rows] = -1000
+        self.y[dead_rows] = -1000
+        self.current_ammo[dead_rows] = 0
+
+        dealt = np.where(dying & ~killed, 0, damage)
+        return killed, dealt
+
+    def export_info(self, rows):
+        """The numeric fields of Character.get_info for every given row, as columns."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return {
+            "location": self.centers(rows),
+            "rotation": self.rotation[rows],
+            "current_ammo": self.current_ammo[rows],
+            "alive": self.alive[rows],
+            "health": self.health[rows],
+            "kills": self.total_kills[rows],
+            "damage_dealt": self.damage_dealt[rows],
+            "meters_moved": self.meters_moved[rows],
+            "total_rotation": self.total_rotation[rows]
+        }
+
+
+class RegistryField:
+    """Character attribute stored in the character's row of its PlayerRegistry."""
+
+    def __init__(self, cast, optional=False):
+        """
+        :param cast: Converts the stored NumPy scalar back to the Python type the attribute always had
+        :param optional: The attribute can be None, stored as NaN
+        """
+        self.cast = cast
+        self.optional = optional
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, character, owner=None):
+        if character is None:
+            return self
+        value = getattr(character.registry, self.name)[character.row]
+        if self.optional and np.isnan(value):
+            return None
+        return self.cast(value)
+
+    def __set__(self, character, value):
+        if self.optional and value is None:
+            value = np.nan
+        getattr(character.registry, self.name)[character.row] = value
+
+
+class RegistryRect:
+    """
+    Live pygame.Rect view of a character's position and size in its PlayerRegistry row.
+    Reading an attribute reads the row, and setting an attribute or calling an in-place method
+    (move_ip, inflate_ip, clamp_ip, ...) writes the result back, so player.rect.x = 500 moves the player.
+    pygame functions accept it wherever they take a rect (through its rect attribute).
+    """
+
+    # Rect methods that modify the rect in place
+    IN_PLACE = frozenset(("move_ip", "inflate_ip", "scale_by_ip", "clamp_ip", "union_ip", "unionall_ip",
+                          "normalize", "update"))
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner):
+        """:param owner: The object with the registry and row (a Character), followed if its row moves"""
+        object.__setattr__(self, "_owner", owner)
+
+    @property
+    def rect(self):
+        # a copy of the current rect, as a plain pygame.Rect
+        registry, row = self._owner.registry, self._owner.row
+        return pygame.Rect(int(registry.x[row]), int(registry.y[row]),
+                           int(registry.width[row]), int(registry.height[row]))
+
+    def _write(self, rect):
+        registry, row = self._owner.registry, self._owner.row
+        registry.x[row] = rect.x
+        registry.y[row] = rect.y
+        registry.width[row] = rect.width
+        registry.height[row] = rect.height
+
+    def __getattr__(self, name):
+        rect = self.rect
+        value = getattr(rect, name)
+        if name in self.IN_PLACE:
+            def in_place(*args, **kwargs):
+                result = value(*args, **kwargs)
+                self._write(rect)
+                return result
+            return in_place
+        return value
+
+    def __setattr__(self, name, value):
+        rect = self.rect
+        setattr(rect, name, value)
+        self._write(rect)
+
+    def __eq__(self, other):
+        return self.rect == other
+
+    def __ne__(self, other):
+        return self.rect != other
+
+    __hash__ = None
+
+    def __iter__(self):
+        return iter(self.rect)
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return self.rect[index]
+
+    def __setitem__(self, index, value):
+        rect = self.rect
+        rect[index] = value
+        self._write(rect)
+
+    def __bool__(self):
+        return bool(self.rect)
+
+    def __copy__(self):
+        return self.rect
+
+    def __repr__(self):
+        return repr(self.rect)
@@ -0,0 +1,248 @@
+"""
+Compact binary match recording and deterministic replay.
+
+A game is fully determined by its obstacles, its players' starting positions and the actions of every tick
+(the simulation runs on SimClock time, see components/sim_clock.py), so that is all a recording stores.
+Replays re-simulate the match without any bot code.
+
+File layout (little endian), append-only, one record per episode after the file header:
+    file header:  b"GDCR", version (u8)
+    episode:      b"EPIS", seed (i64, -1 for none), tick rate (f64), world width, height (u32, u32)
+                  players (u8), then per player: x, y, speed (f64 x3), username length (u8), username (utf-8)
+                  obstacles (u16), then per obstacle: left, top, width, height (i16 x4)
+                  ticks (u32), winner (u8, 255 for none), actions length (u32), zlib compressed actions
+    actions:      per tick and per player (in the order of Simulation.players), a flags byte (ACTION_BITS)
+                  followed by the rotation: i16 if ROTATE_INT is set, f64 if ROTATE_FLOAT is set, none otherwise
+
+Two players fighting for 20 seconds at 120 ticks per second take a few kilobytes.
+"""
+import struct
+import zlib
+from collections import namedtuple
+
+from components.character import Character
+from components.obstacle import Obstacle
+
+FILE_MAGIC = b"GDCR"
+EPISODE_MAGIC = b"EPIS"
+VERSION = 2  # 2: shooting and reloading timers count whole ticks
+
+ACTION_BITS = (("forward", 1), ("right", 2), ("down", 4), ("left", 8), ("shoot", 16))
+ROTATE_INT = 32
+ROTATE_FLOAT = 64
+NO_WINNER = 255
+
+_FILE_HEADER = struct.Struct("<4sB")
+_EPISODE_HEADER = struct.Struct("<4sqdIIB")
+_PLAYER = struct.Struct("<dddB")
+_OBSTACLE = struct.Struct("<hhhh")
+_COUNT = struct.Struct("<H")
+_EPISODE_END = struct.Struct("<IBI")
+_ROTATE_INT = struct.Struct("<h")
+_ROTATE_FLOAT = struct.Struct("<d")
+
+PlayerRecord = namedtuple("PlayerRecord", ["x", "y", "speed", "username"])
+EpisodeRecord = namedtuple("EpisodeRecord", ["seed", "tick_rate", "world_width", "world_height", "players",
+                                             "obstacles", "ticks", "winner", "actions"])
+
+
+class MatchRecorder:
+    """
+    Streams the episodes of a Simulation (or Env) into a recording file, see Simulation.start_recording.
+    Actions are packed as they come in, and each episode is compressed and appended when it ends, so
+    recording costs a few byte appends per player and step.
+    """
+
+    def __init__(self, path, compression_level=6):
+        """
+        :param path: The recording file, created if needed; new episodes are appended to an existing one
+        :param compression_level: zlib compression level of the actions
+        """
+        self.path = path
+        self.compression_level = compression_level
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(_FILE_HEADER.pack(FILE_MAGIC, VERSION))
+        self.header = None  # packed header of the episode being recorded
+        self.actions = bytearray()
+        self.ticks = 0
+        self.episodes = 0
+
+    def begin_episode(self, simulation, seed=None):
+        # Called by Simulation.reset; an unfinished episode is saved without a winner
+        if self.header is not None:
+            self.end_episode()
+
+        header = bytearray(_EPISODE_HEADER.pack(
+            EPISODE_MAGIC, -1 if seed is None else seed, simulation.sim_clock.tick_rate,
+            simulation.world_width, simulation.world_height, len(simulation.players)))
+        for player in simulation.players:
+            username = player.username.encode("utf-8")[:255]
+            header += _PLAYER.pack(player.starting_pos[0], player.starting_pos[1], player.speed, len(username))
+            header += username
+        header += _COUNT.pack(len(simulation.obstacles))
+        for obstacle in simulation.obstacles:
+            header += _OBSTACLE.pack(obstacle.rect.left, obstacle.rect.top, obstacle.rect.width, obstacle.rect.height)
+
+        self.header = header
+        self.actions = bytearray()
+        self.ticks = 0
+
+    def record(self, actions):
+        # Called by Simulation.step with the actions of every player, in order
+        buffer = self.actions
+        for action in actions:
+            flags = 0
+            for name, bit in ACTION_BITS:
+                if action[name]:
+                    flags |= bit
+            rotate = action["rotate"]
+            if rotate:
+                if rotate == int(rotate) and -32768 <= rotate <= 32767:
+                    buffer.append(flags | ROTATE_INT)
+                    buffer += _ROTATE_INT.pack(int(rotate))
+                else:
+                    buffer.append(flags | ROTATE_FLOAT)
+                    buffer += _ROTATE_FLOAT.pack(rotate)
+            else:
+                buffer.append(flags)
+        self.ticks += 1
+
+    def end_episode(self, winner=None):
+        """
+        Appends the episode to the file.
+        :param winner: Index of the winner in Simulation.players, None if the episode ended without one
+        """
+        if self.header is None:
+            return
+        compressed = zlib.compress(bytes(self.actions), self.compression_level)
+        self.file.write(self.header)
+        self.file.write(_EPISODE_END.pack(self.ticks, NO_WINNER if winner is None else winner, len(compressed)))
+        self.file.write(compressed)
+        self.file.flush()
+        self.header = None
+        self.actions = bytearray()
+        self.episodes += 1
+
+    def close(self):
+        self.end_episode()
+        self.file.close()
+
+
+def _number(value):
+    # f64 fields back to the int they usually were, so that the replay computes with the same types
+    return int(value) if value == int(value) else value
+
+
+def decode_actions(data, n_players, ticks):
+    """Unpacks the actions of an episode into one list of action dictionaries per tick."""
+    actions = []
+    offset = 0
+    for _ in range(ticks):
+        tick = []
+        for _ in range(n_players):
+            flags = data[offset]
+            offset += 1
+            action = {name: bool(flags & bit) for name, bit in ACTION_BITS}
+            if flags & ROTATE_INT:
+                action["rotate"] = _ROTATE_INT.unpack_from(data, offset)[0]
+                offset += _ROTATE_INT.size
+            elif flags & ROTATE_FLOAT:
+                action["rotate"] = _ROTATE_FLOAT.unpack_from(data, offset)[0]
+                offset += _ROTATE_FLOAT.size
+            else:
+                action["rotate"] = 0
+            tick.append(action)
+        actions.append(tick)
+    return actions
+
+
+def read_recording(path):
+    """Yields the EpisodeRecord of every episode of a recording file, in order."""
+    with open(path, "rb") as file:
+        data = file.read()
+
+    magic, version = _FILE_HEADER.unpack_from(data, 0)
+    if magic != FILE_MAGIC:
+        raise ValueError(f"{path} is not a match recording")
+    if version != VERSION:
+        raise ValueError(f"{path} has recording version {version}, expected {VERSION}")
+
+    offset = _FILE_HEADER.size
+    while offset < len(data):
+        magic, seed, tick_rate, world_width, world_height, n_players = _EPISODE_HEADER.unpack_from(data, offset)
+        if magic != EPISODE_MAGIC:
+            raise ValueError(f"{path} is corrupted at byte {offset}")
+        offset += _EPISODE_HEADER.size
+
+        players = []
+        for _ in range(n_players):
+            x, y, speed, name_length = _PLAYER.unpack_from(data, offset)
+            offset += _PLAYER.size
+            username = data[offset:offset + name_length].decode("utf-8")
+            offset += name_length
+            players.append(PlayerRecord(_number(x), _number(y), _number(speed), username))
+
+        n_obstacles, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        obstacles = [_OBSTACLE.unpack_from(data, offset + index * _OBSTACLE.size) for index in range(n_obstacles)]
+        offset += n_obstacles * _OBSTACLE.size
+
+        ticks, winner, length = _EPISODE_END.unpack_from(data, offset)
+        offset += _EPISODE_END.size
+        actions = decode_actions(zlib.decompress(data[offset:offset + length]), n_players, ticks)
+        offset += length
+
+        yield EpisodeRecord(None if seed == -1 else seed, _number(tick_rate), world_width, world_height, players, obstacles,
+                            ticks, None if winner == NO_WINNER else winner, actions)
+
+
+def replay_episode(episode, simulation=None):
+    """
+    Re-simulates a recorded episode from its actions, without any bot.
+    Yields (finished, info dictionary) after every tick, as Simulation.step returns them.
+
+    :param episode: An EpisodeRecord (see read_recording)
+    :param simulation: The Simulation to replay in, a headless one by default. To watch the replay, pass an
+        Env(use_game_ui=False, ...) of the same world size (the advanced UI brings its own obstacles).
+    """
+    if simulation is None:
+        from components.simulation import Simulation  # not at the top, the simulation imports this module
+        simulation = Simulation(episode.world_width, episode.world_height, len(episode.obstacles),
+                                episode.tick_rate)
+
+    bounds = (0, 0, episode.world_width, episode.world_height)
+    players = [Character((record.x, record.y), None, speed=record.speed, boundaries=bounds,
+                         username=record.username)
+               for record in episode.players]
+    obstacles = [Obstacle((left, top), (width, height)) for left, top, width, height in episode.obstacles]
+    simulation.set_players_bots_objects(players, [None] * len(players), obstacles)
+
+    for actions in episode.actions:
+        yield simulation.step(actions=actions)
+
+
+def main():
+    # Replays every episode of a recording and checks that it ends as it was recorded
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay the episodes of a match recording")
+    parser.add_argument("path", help="the recording file")
+    args = parser.parse_args()
+
+    from components.simulation import Simulation
+
+    for index, episode in enumerate(read_recording(args.path)):
+        simulation = Simulation(episode.world_width, episode.world_height, len(episode.obstacles), episode.tick_rate)
+        finished = False
+        for finished, info in replay_episode(episode, simulation):
+            pass
+        alive = simulation.alive_players
+        winner = simulation.players.index(alive[0]) if finished and alive else None
+        recorded = episode.players[episode.winner].username if episode.winner is not None else None
+        replayed = episode.players[winner].username if winner is not None else None
+        print(f"Episode {index}: {episode.ticks} ticks, seed {episode.seed}, winner {recorded}, "
+              f"replayed winner {replayed}{'' if recorded == replayed else ' (MISMATCH)'}")
+
+
+if __name__ == "__main__":
+    main()
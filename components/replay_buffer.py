@@ -0,0 +1,179 @@
+import random
+import numpy as np
+import torch
+
+# Size of each part of a normalized state (see MyBot.normalize_state)
+STATE_FIELDS = {
+    'location': 2,
+    'status': 2,
+    'rays': 30
+}
+
+
+class ReplayBuffer:
+    """
+    Fixed-size replay memory stored in preallocated contiguous tensors (one per state field, for states and
+    next states, plus action, reward and done columns), used as a ring: once full, the oldest transition is
+    overwritten. Storing a transition copies it into its row and sampling gathers rows by index, so neither
+    depends on the number of transitions stored.
+    """
+
+    def __init__(self, capacity=100000, state_fields=None, device="cpu"):
+        """
+        :param capacity: Maximum number of transitions kept
+        :param state_fields: Size of each field of a state dict, STATE_FIELDS by default
+        :param device: Where the transitions are stored (sampled batches are moved by the caller)
+        """
+        if state_fields is None:
+            state_fields = STATE_FIELDS
+
+        self.capacity = capacity
+        self.device = torch.device(device)
+        self.position = 0  # next row to write
+        self.size = 0
+
+        self.states = {name: torch.zeros((capacity, size), dtype=torch.float32, device=self.device)
+                       for name, size in state_fields.items()}
+        self.next_states = {name: torch.zeros((capacity, size), dtype=torch.float32, device=self.device)
+                            for name, size in state_fields.items()}
+        self.actions = torch.zeros(capacity, dtype=torch.long, device=self.device)
+        self.rewards = torch.zeros(capacity, dtype=torch.float32, device=self.device)
+        self.dones = torch.zeros(capacity, dtype=torch.float32, device=self.device)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, next_state, done):
+        """Stores one transition and returns the row it was written to."""
+        row = self.position
+        for name, column in self.states.items():
+            column[row] = state[name]
+        for name, column in self.next_states.items():
+            column[row] = next_state[name]
+        self.actions[row] = action
+        self.rewards[row] = reward
+        self.dones[row] = float(done)
+
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return row
+
+    def sample_indices(self, batch_size):
+        # distinct rows, like random.sample on the old deque
+        return torch.tensor(random.sample(range(self.size), batch_size), dtype=torch.long, device=self.device)
+
+    def gather(self, indices):
+        """
+        Returns the transitions at the given rows as batched tensors:
+        (states, actions, rewards, next_states, dones), where states and next_states are dicts of tensors.
+        """
+        states = {name: column[indices] for name, column in self.states.items()}
+        next_states = {name: column[indices] for name, column in self.next_states.items()}
+        return states, self.actions[indices], self.rewards[indices], next_states, self.dones[indices]
+
+    def sample(self, batch_size):
+        """Returns batch_size distinct transitions chosen uniformly at random, see gather."""
+        return self.gather(self.sample_indices(batch_size))
+
+
+class SumTree:
+    """
+    Binary tree where every node holds the sum of its two children, over one leaf per replay row.
+    Updating a leaf and finding the leaf at a given cumulative sum both take O(log n).
+    Leaves live at tree[leaf_start:], and node i has the children 2i and 2i + 1 (the root is node 1).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Rounded up to a power of two so that all leaves are at the same depth
+        self.leaf_start = 1 << max(0, (capacity - 1).bit_length())
+        self.tree = np.zeros(2 * self.leaf_start, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, indices, values):
+        """Sets the leaves at indices (an integer array) to values, then fixes their ancestors."""
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaf_start
+        self.tree[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """
+        Returns, for every value in [0, total), the index of the leaf where the running sum of the leaves
+        goes past it. A leaf is then found with a probability proportional to its value, and a leaf of value 0
+        is never found (as long as the total is not 0).
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaf_start:
+            left = 2 * nodes
+            left_sums = self.tree[left]
+            # Rounding can leave a value past the sum of a node's leaves; never step into an empty subtree then
+            go_right = (values >= left_sums) & (self.tree[left + 1] > 0)
+            values = np.where(go_right, values - left_sums, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaf_start
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    ReplayBuffer that samples transitions with a probability proportional to priority ** alpha, where the
+    priority is the absolute TD error of the last time the transition was trained on (Schaul et al., 2016).
+    New transitions get the highest priority seen so far, so each one is replayed at least once.
+    The bias of this sampling is corrected by importance-sampling weights, (N * P(i)) ** -beta normalized by
+    their maximum, with beta annealed towards 1.
+    """
+
+    def __init__(self, capacity=100000, state_fields=None, device="cpu", alpha=0.6, beta=0.4,
+                 beta_increment=0.0001, priority_epsilon=0.01, seed=None):
+        """
+        :param alpha: How much prioritization is used (0 is uniform sampling)
+        :param beta: Initial strength of the importance-sampling correction (1 corrects fully)
+        :param beta_increment: Added to beta at every sample, up to 1
+        :param priority_epsilon: Added to every TD error so that no transition stops being sampled
+        :param seed: Seed of the buffer's own random generator, used for sampling
+        """
+        super().__init__(capacity, state_fields, device)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.priority_epsilon = priority_epsilon
+        self.max_priority = 1.0  # already raised to alpha
+        self.tree = SumTree(capacity)
+        self.rng = np.random.default_rng(seed)
+
+    def append(self, state, action, reward, next_state, done):
+        row = super().append(state, action, reward, next_state, done)
+        self.tree.update([row], [self.max_priority])
+        return row
+
+    def sample_with_weights(self, batch_size):
+        """
+        Returns (indices, weights): batch_size rows sampled by priority (one per equal slice of the total, so
+        the batch is spread over the whole distribution) and their importance-sampling weights.
+        """
+        total = self.tree.total()
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        # Only the filled rows have a priority, so only they can be found
+        rows = self.tree.find(np.minimum(values, np.nextafter(total, 0)))
+
+        probabilities = self.tree.tree[rows + self.tree.leaf_start] / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        indices = torch.from_numpy(rows).to(self.device)
+        return indices, torch.tensor(weights, dtype=torch.float32, device=self.device)
+
+    def update_priorities(self, indices, td_errors):
+        """Sets the priorities of the given rows from the absolute TD errors of their last training step."""
+        indices = torch.as_tensor(indices).cpu().numpy()
+        td_errors = torch.as_tensor(td_errors).detach().cpu().numpy()
+        priorities = (np.abs(td_errors) + self.priority_epsilon) ** self.alpha
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
@@ -0,0 +1,28 @@
+class SimClock:
+    """
+    Simulated game clock owned by the environment.
+    Every Env.step advances it by one tick of a fixed length (dt), so combat timers and episode time limits
+    follow the number of simulated ticks instead of the wall clock. Games then play out the same way
+    no matter how fast the machine steps them.
+    """
+
+    def __init__(self, tick_rate=120):
+        """
+        :param tick_rate: Number of simulated ticks per game second
+        """
+        self.tick_rate = tick_rate
+        self.dt = 1 / tick_rate
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+
+    def reset(self):
+        self.ticks = 0
+
+    def now(self):
+        # returns the simulated time in seconds since the last reset
+        return self.ticks * self.dt
+
+    def seconds_to_ticks(self, seconds):
+        return round(seconds * self.tick_rate)
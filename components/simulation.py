@@ -0,0 +1,523 @@
+import math
+import random
+import numpy as np
+from components.world_gen import spawn_objects
+from components.spatial_index import SpatialGrid
+from components.sim_clock import SimClock
+from components.observation import OBSERVATION_SIZE, encode_observations
+from components.events import EventBus, EpisodeEndEvent
+from components.phase_timer import PhaseTimer, timed_phase
+from components.recording import MatchRecorder
+from components.player_registry import PlayerRegistry
+
+
+class Simulation:
+    """
+    Render-free game core: movement, rays, shooting, damage and rewards.
+    It never touches the pygame display, mixer, surfaces or frame clock, so training processes can use it
+    directly (or through Env(training=True)) without any SDL setup or per-step rendering cost.
+    Env adds the optional rendering layer on top of it.
+    """
+
+    OBS_MODES = ("dict", "array")
+
+    def __init__(self, world_width=1280, world_height=1280, n_of_obstacles=10, tick_rate=120, obs_mode="dict",
+                 batched_act=False):
+        """
+        :param obs_mode: What the bots receive in act(): "dict" for Character.get_info, or "array" for their
+            row of self.observations, a preallocated float32 array of shape (players, OBSERVATION_SIZE) that
+            is refilled in place from the player registry (see components/observation.py). The players_info
+            of step then has no "rays", the bots read them from their observation
+        :param batched_act: Ask every bot for its action at the start of the step, through the act_batch
+            static method of its class when it has one (see MyBot.act_batch), instead of one act() call per
+            player in between the moves of the others
+        """
+        if obs_mode not in self.OBS_MODES:
+            raise ValueError(f"obs_mode must be one of {self.OBS_MODES}, got {obs_mode!r}")
+
+        self.running = True
+
+        # REAL WORLD DIMENSIONS
+        self.world_width = world_width
+        self.world_height = world_height
+
+        # Game time: advances by 1 / tick_rate seconds per step, whatever the real frame rate is
+        self.sim_clock = SimClock(tick_rate)
+
+        # Shots, hits, kills, reloads and episode ends; free until someone subscribes or records
+        self.events = EventBus()
+
+        # Time spent in each phase of the game loop, see enable_profiling
+        self.phase_timer = PhaseTimer()
+
+        # Writes every episode to a match recording, see start_recording
+        self.recorder = None
+        self.seed = None  # seed of the current episode's obstacles, see reset
+        self.episode_over = True  # no episode in progress until the first reset
+
+        self.n_of_obstacles = n_of_obstacles
+        self.min_obstacle_size = (50, 50)
+        self.max_obstacle_size = (100, 100)
+
+        # INIT SOME VARIABLES
+        self.OG_bots = None
+        self.OG_players = None
+        self.OG_obstacles = None
+
+        self.bots = None
+        self.players = None
+        self.obstacles = None
+        self.obstacle_index = None
+        self.alive_players = []
+
+        self.obs_mode = obs_mode
+        self.batched_act = batched_act
+        self.observations = None
+
+        # The stats of every player, moved into this registry at reset so they can be updated in bulk
+        self.player_registry = PlayerRegistry()
+        self.player_rows = None
+
+        """REWARD VARIABLES"""
+        self.last_positions = {}
+        self.last_damage = {}
+        self.last_kills = {}
+        self.last_health = {}
+        self.visited_areas = {}
+
+        self.steps = 0
+
+    def set_players_bots_objects(self, players, bots, obstacles=None):
+        # Players that leave the environment get their own registry back, and their rows here are released
+        for player in self.OG_players or []:
+            if player not in players and player.registry is self.player_registry:
+                player.attach_registry(PlayerRegistry(capacity=1))
+
+        self.OG_players = players
+        self.OG_bots = bots
+        self.OG_obstacles = obstacles
+
+        self.reset()
+
+    def get_world_bounds(self):
+        return (0, 0, self.world_width, self.world_height)
+
+    def get_ray_cache_stats(self):
+        # Ray cache hits and misses summed over all players, since they were created
+        players = self.OG_players or []
+        hits = sum(player.ray_cache_hits for player in players)
+        misses = sum(player.ray_cache_misses for player in players)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0
+        }
+
+    def enable_profiling(self, report_every=0):
+        """
+        Starts timing every phase of the game loop (see get_phase_stats).
+        :param report_every: Print a summary every this many steps (0 never prints)
+        """
+        self.phase_timer.enabled = True
+        self.phase_timer.report_every = report_every
+
+    def disable_profiling(self):
+        self.phase_timer.enabled = False
+
+    def get_phase_stats(self):
+        # Time spent per phase since profiling was enabled (or reset), see PhaseTimer.stats
+        return self.phase_timer.stats()
+
+    def reset_phase_stats(self):
+        self.phase_timer.reset()
+
+    def create_obstacles(self, randomize_objects=False):
+        # Create new obstacles only if needed
+        if randomize_objects or self.OG_obstacles is None:
+            self.OG_obstacles = spawn_objects(
+                (0, 0, self.world_width, self.world_height),
+                self.max_obstacle_size,
+                self.min_obstacle_size,
+                self.n_of_obstacles,
+                rng=random.Random(self.seed) if self.seed is not None else None
+            )
+        return self.OG_obstacles
+
+    def start_recording(self, path):
+        """
+        Records every episode from the next reset on into a match recording file, appending to it if it
+        exists (see components/recording.py). Replay them with python -m components.recording path.
+        """
+        self.stop_recording()
+        self.recorder = MatchRecorder(path)
+
+    def stop_recording(self):
+        # Saves the episode being recorded, if any, and closes the file
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def reset(self, randomize_objects=False, randomize_players=False, seed=None):
+        """
+        :param seed: Seed of the obstacle layout when new obstacles are spawned, saved in match recordings
+        """
+        # An episode still in progress (e.g. stopped by a time limit) ends without a winner
+        self.end_episode()
+
+        self.running = True
+        self.seed = seed
+
+        self.last_positions = {}
+        self.last_damage = {}
+        self.last_kills = {}
+        self.last_health = {}
+        self.visited_areas = {}
+
+        self.steps = 0
+        self.sim_clock.reset()
+        self.alive_players = []
+
+        # TODO: add variables for parameters
+        self.obstacles = self.create_obstacles(randomize_objects)
+
+        # Obstacles are static during an episode, so they are indexed once here
+        self.obstacle_index = SpatialGrid(self.obstacles, self.get_world_bounds())
+
+        self.players = self.OG_players.copy()
+        self.bots = self.OG_bots
+        if randomize_players:
+            self.bots = self.bots.shuffle()
+            for index in range(len(self.players)):
+                self.players[index].related_bot = self.bots[index]  # ensuring bots change location
+
+        else:
+            for index in range(len(self.players)):
+                self.players[index].related_bot = self.bots[index]
+
+        for player in self.players:
+            player.reset()
+            temp = self.players.copy()
+            temp.remove(player)
+            player.players = temp  # Other players
+            player.objects = self.obstacles
+            player.obstacle_index = self.obstacle_index
+            player.invalidate_ray_cache()
+            player.clock = self.sim_clock
+            player.events = self.events
+            player.phase_timer = self.phase_timer
+
+        for player in self.players:
+            player.attach_registry(self.player_registry)
+        self.player_rows = np.array([player.row for player in self.players], dtype=np.int64)
+        for player in self.players:
+            player.other_player_rows = np.array([other.row for other in player.players], dtype=np.int64)
+
+        if self.obs_mode == "array":
+            if self.observations is None or len(self.observations) != len(self.players):
+                self.observations = np.zeros((len(self.players), OBSERVATION_SIZE), dtype=np.float32)
+            self.observe()
+
+        if self.recorder is not None:
+            self.recorder.begin_episode(self, seed)
+        self.episode_over = False
+
+    def end_episode(self, winner=None):
+        """
+        Emits the EpisodeEndEvent of the current episode and saves its recording, once per episode.
+        :param winner: The player left alive, None if the episode was cut short or nobody survived
+        """
+        if self.episode_over:
+            return
+        self.episode_over = True
+        if self.events.active:
+            self.events.emit(EpisodeEndEvent(self.sim_clock.now(), winner.username if winner is not None else None,
+                                             self.steps))
+        if self.recorder is not None:
+            self.recorder.end_episode(self.players.index(winner) if winner is not None else None)
+
+    def observe(self, index=None):
+        """
+        Writes the normalized observation of the players into self.observations, in the order of self.players,
+        from the player registry and the players' ray arrays.
+        :param index: Only refresh the row of self.players[index]
+        """
+        if index is None:
+            players, rows, out = self.players, self.player_rows, self.observations
+        else:
+            players, rows, out = [self.players[index]], self.player_rows[index:index + 1], \
+                self.observations[index:index + 1]
+        for player in players:
+            player.get_rays()  # re-casts them if they are out of date
+        encode_observations(self.player_registry, rows, [player.ray_features for player in players], out)
+        return self.observations
+
+    def get_bot_input(self, index):
+        # what the bot of self.players[index] receives in act(), on the current state in both modes
+        if self.obs_mode == "array":
+            self.observe(index)
+            return self.observations[index]
+        return self.players[index].get_info()
+
+    def get_players_info(self, shots_fired):
+        """
+        The players_info of step: Character.get_info of every player by username, plus whether it shot.
+        In array mode, where the bots get their rays from self.observations, the dictionaries are built from
+        the registry columns and have no "rays".
+        """
+        players_info = {}
+        if self.obs_mode == "array":
+            columns = {key: values.tolist() for key, values in
+                       self.player_registry.export_info(self.player_rows).items()}
+            for index, player in enumerate(self.players):
+                info = {key: values[index] for key, values in columns.items()}
+                info["location"] = tuple(info["location"])
+                players_info[player.username] = info
+        else:
+            for player in self.players:
+                players_info[player.username] = player.get_info()
+        for player in self.players:
+            players_info[player.username]["shot_fired"] = shots_fired[player.username]
+        return players_info
+
+    def act_all(self):
+        """
+        Returns the actions of every player, in the order of self.players, all chosen on the current state.
+        Bots of a class with an act_batch static method are asked together, the others one by one.
+        """
+        actions = [None] * len(self.players)
+        if self.obs_mode == "array":
+            bot_inputs = self.observe()  # all the rows at once, nobody moves in between
+        else:
+            bot_inputs = [player.get_info() for player in self.players]
+
+        groups = {}  # bot class -> indices of its players
+        for index, player in enumerate(self.players):
+            groups.setdefault(type(player.related_bot), []).append(index)
+
+        for bot_class, indices in groups.items():
+            if hasattr(bot_class, "act_batch"):
+                bots = [self.players[index].related_bot for index in indices]
+                inputs = [bot_inputs[index] for index in indices]
+                for index, action in zip(indices, bot_class.act_batch(bots, inputs)):
+                    actions[index] = action
+            else:
+                for index in indices:
+                    actions[index] = self.players[index].related_bot.act(bot_inputs[index])
+        return actions
+
+    def step(self, debugging=False, actions=None):
+        """
+        :param actions: The actions of every player, in the order of self.players, instead of asking the bots
+            (e.g. to replay a recording)
+        """
+        timer = self.phase_timer
+        timer.begin()
+
+        self.steps += 1
+        self.sim_clock.tick()
+
+        alive_players = []
+        shots_fired = {}
+
+        # The clock does not move during a tick, so every reload timer can be updated up front
+        rows = self.player_rows[self.player_registry.alive[self.player_rows]]
+        self.player_registry.reload(rows, self.sim_clock.ticks, self.sim_clock.tick_rate)
+        timer.lap("reload")
+
+        all_actions = actions
+        if all_actions is None and self.batched_act:
+            all_actions = self.act_all()
+        timer.lap("act")
+        recorded_actions = [] if self.recorder is not None else None
+
+        for index, player in enumerate(self.players):
+            if all_actions is not None:
+                actions = all_actions[index]
+            else:
+                actions = player.related_bot.act(self.get_bot_input(index))
+                timer.lap("act")
+            if recorded_actions is not None:
+                recorded_actions.append(actions)
+
+            if player.alive:
+
+                alive_players.append(player)
+
+                if debugging:
+                    print("Bot would like to do:", actions)
+                # All the requested directions as one displacement, resolved in a single move
+                dx = (bool(actions["right"]) - bool(actions["left"])) * player.speed
+                dy = (bool(actions["down"]) - bool(actions["forward"])) * player.speed
+                if dx or dy:
+                    player.move(dx, dy)
+                if actions["rotate"]:
+                    player.add_rotate(actions["rotate"])
+                timer.lap("movement")
+                if actions["shoot"]:
+                    player.shoot()
+                    timer.lap("shooting")
+
+            shots_fired[player.username] = actions["shoot"]
+
+        self.alive_players = alive_players
+        if recorded_actions is not None:
+            self.recorder.record(recorded_actions)
+
+        # Gather the info once everyone has moved, so these rays are still valid (cached) for
+        # the reward/remember calls after this step and for the bots' next act()
+        players_info = self.get_players_info(shots_fired)
+
+        new_dic = {
+            "general_info": {
+                "total_players": len(self.players),
+                "alive_players": len(alive_players)
+            },
+            "players_info": players_info
+        }
+
+        if self.obs_mode == "array":
+            new_dic["observations"] = self.observe()
+        timer.lap("info")
+
+        finished = len(alive_players) <= 1  # Game is over
+        if finished:
+            self.end_episode(alive_players[0] if alive_players else None)
+            # self.running = False
+
+        self.after_step(finished, new_dic)
+        timer.end_step()
+        return finished, new_dic
+
+    def after_step(self, finished, info_dictionary):
+        # Called at the end of every step, before its timings are closed; Env renders here
+        pass
+
+    """TO MODIFY"""
+    def calculate_reward_empty(self, info_dictionary, bot_username):
+        """THIS FUNCTION IS USED TO CALCULATE THE REWARD FOR A BOT"""
+        """NEEDS TO BE WRITTEN BY YOU TO FINE TUNE YOURS"""
+
+        # retrieve the players' information from the dictionary
+        players_info = info_dictionary.get("players_info", {})
+        bot_info = players_info.get(bot_username)
+
+        # if the bot is not found, return a default reward of 0
+        if bot_info is None:
+            print("Bot not found in the dictionary")
+            return 0
+
+        # Extract variables from the bot's info
+        location = bot_info.get("location", [0, 0])
+        rotation = bot_info.get("rotation", 0)
+        rays = bot_info.get("rays", [])
+        current_ammo = bot_info.get("current_ammo", 0)
+        alive = bot_info.get("alive", False)
+        kills = bot_info.get("kills", 0)
+        damage_dealt = bot_info.get("damage_dealt", 0)
+        meters_moved = bot_info.get("meters_moved", 0)
+        total_rotation = bot_info.get("total_rotation", 0)
+        health = bot_info.get("health", 0)
+
+        # Calculate reward:
+        reward = 0
+        # Add your reward calculation here
+
+        return reward
+
+    @timed_phase("reward")
+    def calculate_reward(self, info_dictionary, bot_username):
+        """
+        Reward function for training bots.
+        Reward components (one-time per step):
+          1. Walking: if the bot moves, +1 (only if it moved this step).
+          2. Exploring: if the bot enters a new grid cell (e.g., 100x100), +5.
+          3. Damage: reward the damage inflicted this frame.
+          4. Kill: reward massively for new kills (+20 per kill).
+          5. Negative reward for missing: if a shot was fired and no damage was dealt, -1.
+          6. Negative reward if hit by enemy: if health decreases compared to last step, negative penalty.
+          7. Negative reward for staying near the borders: if within 50 pixels of any border, -1.
+
+        Additionally, all rewards are scaled by a time-based multiplier that decays over the episode.
+        """
+        players_info = info_dictionary.get("players_info", {})
+        bot_info = players_info.get(bot_username)
+        if bot_info is None:
+            print(f"Bot {bot_username} not found in info dictionary.")
+            return 0
+
+        # Extract current values
+        current_position = bot_info.get("location", [0, 0])
+        damage_dealt = bot_info.get("damage_dealt", 0)
+        kills = bot_info.get("kills", 0)
+        alive = bot_info.get("alive", False)
+        health = bot_info.get("health", 100)
+        # Expect a flag indicating if a shot was fired this frame
+        shot_fired = bot_info.get("shot_fired", False)
+
+        # Initialize tracking dictionaries if necessary
+        if bot_username not in self.last_positions:
+            self.last_positions[bot_username] = current_position
+        if bot_username not in self.last_damage:
+            self.last_damage[bot_username] = damage_dealt
+        if bot_username not in self.last_kills:
+            self.last_kills[bot_username] = kills
+        if bot_username not in self.last_health:
+            self.last_health[bot_username] = health
+        if bot_username not in self.visited_areas:
+            self.visited_areas[bot_username] = set()
+
+        reward = 0
+
+        # 1. Walking reward (one-time): if moved at all, +1
+        distance_moved = math.dist(current_position, self.last_positions[bot_username])
+        if distance_moved > 0:
+            reward += 0.01
+
+        # 2. Exploration reward (one-time): if entering a new grid cell, +1
+        grid_size = 100  # Adjust as needed.
+        cell = (int(current_position[0] // grid_size), int(current_position[1] // grid_size))
+        if cell not in self.visited_areas[bot_username]:
+            reward += 0.1
+            self.visited_areas[bot_username].add(cell)
+
+        # 3. Damage reward: reward the damage inflicted this frame.
+        delta_damage = damage_dealt - self.last_damage[bot_username]
+        if delta_damage > 0:
+            reward += delta_damage * 2  # 2 point per damage unit
+
+        # 4. Kill reward: massive reward for new kills.
+        delta_kills = kills - self.last_kills[bot_username]
+        if delta_kills > 0:
+            reward += delta_kills * 15  # 15 points per kill
+
+        # 5. Negative reward for missing: if a shot was fired and no damage occurred.
+        if shot_fired and delta_damage <= 0:
+            reward -= 1
+
+        # 6. Negative reward if hit by enemy: if health decreased.
+        delta_health = self.last_health[bot_username] - health
+        if delta_health > 0:
+            reward -= delta_health * 0.2  # Adjust penalty factor as needed
+
+        # 7. Negative reward for staying near the borders.
+        border_threshold = 50
+        near_border = (
+                current_position[0] < border_threshold or
+                current_position[0] > self.world_width - border_threshold or
+                current_position[1] < border_threshold or
+                current_position[1] > self.world_height - border_threshold
+        )
+        if near_border:
+            reward -= 1
+
+        # Update tracking values for next step.
+        self.last_positions[bot_username] = current_position
+        self.last_damage[bot_username] = damage_dealt
+        self.last_kills[bot_username] = kills
+        self.last_health[bot_username] = health
+
+        decay_rate = 0.0001  # Determines how fast the multiplier decays per step.
+        time_multiplier = max(0.2, 1 - decay_rate * self.steps)
+        reward *= time_multiplier
+
+        return reward
\ No newline at end of file
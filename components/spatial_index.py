@@ -0,0 +1,194 @@
+import math
+import numpy as np
+from components.utils import rects_to_array, ray_rect_hit
+
+
+class SpatialGrid:
+    """
+    Uniform grid over the (static) obstacles of a world, built once per reset.
+    Movement and ray casting query only the cells they touch instead of scanning every obstacle,
+    so the per-step cost no longer grows with the number of obstacles.
+
+    The grid is not updated if obstacles move or are added after it was built; build a new one instead.
+    """
+
+    def __init__(self, objects, world_bounds, cell_size=128, min_objects_for_ray_query=150):
+        """
+        :param objects: The obstacles to index (anything with a pygame rect)
+        :param world_bounds: The boundaries of the world (left, top, right, bottom)
+        :param cell_size: The width and height of a grid cell in pixels
+        :param min_objects_for_ray_query: Below this many obstacles, testing every rect is cheaper than walking
+            the grid (rays are long and cross most of the world), so rects_along_rays skips the grid
+        """
+        self.objects = list(objects)
+        self.min_objects_for_ray_query = min_objects_for_ray_query
+        # [left, top, right, bottom] rows, in the same order as self.objects
+        self.rects = rects_to_array(obj.rect for obj in self.objects)
+        self.rect_rows = self.rects.tolist()  # same, as Python floats for the scalar ray tests of first_hit
+
+        self.cell_size = cell_size
+        self.left = world_bounds[0]
+        self.top = world_bounds[1]
+        self.cols = max(1, math.ceil((world_bounds[2] - world_bounds[0]) / cell_size))
+        self.rows = max(1, math.ceil((world_bounds[3] - world_bounds[1]) / cell_size))
+
+        # Each obstacle is registered in every cell it touches, edges included.
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+        for index, rect in enumerate(self.rects):
+            col_start, row_start = self._cell_of(rect[0], rect[1])
+            col_end, row_end = self._cell_of(rect[2], rect[3])
+            for row in range(row_start, row_end + 1):
+                for col in range(col_start, col_end + 1):
+                    self.cells[row * self.cols + col].append(index)
+
+        # Flattened (CSR) copy of self.cells for vectorized lookups.
+        counts = np.array([len(cell) for cell in self.cells], dtype=np.int64)
+        self.cell_starts = np.concatenate(([0], np.cumsum(counts)))
+        self.cell_items = np.array([index for cell in self.cells for index in cell], dtype=np.int64)
+
+        # Positions of the vertical and horizontal grid lines
+        self.grid_x = self.left + cell_size * np.arange(self.cols + 1)
+        self.grid_y = self.top + cell_size * np.arange(self.rows + 1)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _cell_of(self, x, y):
+        col = int((x - self.left) // self.cell_size)
+        row = int((y - self.top) // self.cell_size)
+        return min(max(col, 0), self.cols - 1), min(max(row, 0), self.rows - 1)
+
+    def query_rect(self, rect):
+        """
+        Returns the obstacles whose cells overlap the given pygame rect, in their original order.
+        This is a broad phase: the caller still has to test the returned obstacles against the rect.
+        """
+        col_start, row_start = self._cell_of(rect.left, rect.top)
+        col_end, row_end = self._cell_of(rect.right, rect.bottom)
+
+        if col_start == col_end and row_start == row_end:
+            return [self.objects[index] for index in self.cells[row_start * self.cols + col_start]]
+
+        indices = set()
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                indices.update(self.cells[row * self.cols + col])
+        return [self.objects[index] for index in sorted(indices)]
+
+    def rects_along_rays(self, start, ends):
+        """
+        Returns the [left, top, right, bottom] rows of the obstacles the rays start -> ends[i] may hit,
+        in their original order.
+        """
+        if len(self.objects) < self.min_objects_for_ray_query:
+            return self.rects
+        return self.rects[self.query_rays(start, ends)]
+
+    def query_rays(self, start, ends):
+        """
+        Returns the sorted indices (into self.objects and self.rects) of the obstacles registered in any cell
+        crossed by the ray segments start -> ends[i].
+
+        :param start: The shared origin of the rays (x, y)
+        :param ends: A NumPy array of shape (R, 2) with the end point of each ray
+        """
+        if not self.objects:
+            return np.empty(0, dtype=np.int64)
+
+        origin = np.asarray(start, dtype=np.float64)
+        direction = np.asarray(ends, dtype=np.float64) - origin
+
+        # Fractions of each ray at which it crosses a vertical or horizontal grid line.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossings_x = (self.grid_x[None, :] - origin[0]) / direction[:, 0, None]
+            crossings_y = (self.grid_y[None, :] - origin[1]) / direction[:, 1, None]
+        crossings = np.concatenate((
+            np.zeros((len(direction), 1)),
+            crossings_x,
+            crossings_y,
+            np.ones((len(direction), 1))
+        ), axis=1)
+        crossings[~((crossings >= 0) & (crossings <= 1))] = np.inf
+        crossings.sort(axis=1)
+
+        # The midpoint between two consecutive crossings lies inside exactly one of the cells the ray visits.
+        with np.errstate(invalid="ignore"):
+            midpoints = (crossings[:, :-1] + crossings[:, 1:]) / 2
+        valid = np.isfinite(midpoints)
+        t = midpoints[valid]
+        ray = np.nonzero(valid)[0]
+        cols = np.floor((origin[0] + t * direction[ray, 0] - self.left) / self.cell_size).astype(np.int64)
+        rows = np.floor((origin[1] + t * direction[ray, 1] - self.top) / self.cell_size).astype(np.int64)
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        visited = np.zeros(self.cols * self.rows, dtype=bool)
+        visited[rows[inside] * self.cols + cols[inside]] = True
+        cells = np.flatnonzero(visited)
+
+        # Gather the contents of every visited cell from the flattened layout.
+        starts = self.cell_starts[cells]
+        counts = self.cell_starts[cells + 1] - starts
+        total = counts.sum()
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        candidates = np.zeros(len(self.objects), dtype=bool)
+        candidates[self.cell_items[offsets]] = True
+        return np.flatnonzero(candidates)
+
+    def first_hit(self, start, end, max_t=1.0):
+        """
+        Returns (t, index) of the nearest obstacle hit by the ray segment start -> end, or (math.inf, -1).
+        Only the cells the ray crosses are visited, in order (grid DDA), and the walk stops as soon as no
+        obstacle further away can be hit closer than the best hit so far, or beyond max_t.
+        On equal distances the obstacle with the lowest index wins, as with cast_rays and argmin.
+
+        :param start: The origin of the ray (x, y), inside the grid
+        :param end: The end point of the ray (x, y)
+        :param max_t: Fraction of the ray past which hits are not needed (e.g. a closer hit elsewhere)
+        """
+        x0, y0 = float(start[0]), float(start[1])
+        direction = (float(end[0]) - x0, float(end[1]) - y0)
+        inverse = tuple(1.0 / component if component != 0 else None for component in direction)
+        origin = (x0, y0)
+
+        col, row = self._cell_of(x0, y0)
+        steps = []
+        for position, cell, line_start, component in ((x0, col, self.left, direction[0]),
+                                                     (y0, row, self.top, direction[1])):
+            # (step, fraction of the ray at the next grid line, fraction between two grid lines)
+            if component > 0:
+                steps.append((1, (line_start + (cell + 1) * self.cell_size - position) / component,
+                              self.cell_size / component))
+            elif component < 0:
+                steps.append((-1, (line_start + cell * self.cell_size - position) / component,
+                              -self.cell_size / component))
+            else:
+                steps.append((0, math.inf, math.inf))
+        (step_col, next_x, delta_x), (step_row, next_y, delta_y) = steps
+
+        limit = min(max_t, 1.0)
+        best_t, best_index = math.inf, -1
+        tested = set()
+        while True:
+            for index in self.cells[row * self.cols + col]:
+                if index in tested:
+                    continue
+                tested.add(index)
+                t = ray_rect_hit(origin, direction, inverse, self.rect_rows[index])
+                if t < best_t or (t == best_t and index < best_index):
+                    best_t, best_index = t, index
+
+            # Obstacles only registered in the next cells are hit at or after the exit of this one
+            exit_t = min(next_x, next_y)
+            if best_t <= exit_t or exit_t >= limit:
+                break
+            if next_x < next_y:
+                col += step_col
+                next_x += delta_x
+            else:
+                row += step_row
+                next_y += delta_y
+            if not (0 <= col < self.cols and 0 <= row < self.rows):
+                break
+
+        return best_t, best_index
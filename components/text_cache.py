@@ -0,0 +1,61 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """
+    Shared cache of fonts and rendered text surfaces for the HUD and the UI screens.
+    Loading a font and rasterizing its glyphs is slow, and the texts drawn every frame (health, ammo, titles)
+    rarely change, so each font is loaded once and each (font, size, text, color) surface is rendered once.
+
+    The surfaces are shared between callers: blit them, do not draw on them.
+    """
+
+    def __init__(self, max_surfaces=512):
+        """
+        :param max_surfaces: Number of rendered texts kept, the least recently used ones are evicted first
+        """
+        self.max_surfaces = max_surfaces
+        self.fonts = {}  # (font name, size) -> pygame.font.Font
+        self.surfaces = OrderedDict()  # (font name, size, text, color, antialias) -> surface, oldest first
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size, name=None):
+        """
+        Returns the font, loading it on first use.
+        :param size: The font size
+        :param name: A font file, None for pygame's default font
+        """
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, text, size, color, name=None, antialias=True):
+        """
+        Returns text rendered like pygame.font.Font(name, size).render(text, antialias, color).
+        :param color: Anything pygame.Color accepts ("white", (255, 255, 255), ...)
+        """
+        key = (name, size, text, tuple(pygame.Color(color)), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.surfaces[key] = self.font(size, name).render(text, antialias, color)
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.fonts = {}
+        self.surfaces.clear()
+
+
+# The cache used by Character.draw and the screens of advanced_UI, cleared by Env when it initializes pygame
+TEXT_CACHE = TextCache()
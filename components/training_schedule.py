@@ -0,0 +1,41 @@
+class TrainingSchedule:
+    """
+    How much MyBot trains per environment step: after a warmup, gradient_steps updates every train_every
+    stored transitions, and a target network sync every update_target_freq transitions.
+    The async learner thread follows the same updates-per-step ratio.
+    """
+
+    def __init__(self, train_every=1, gradient_steps=1, warmup=1000, update_target_freq=1000, target_update_tau=1.0):
+        """
+        :param train_every: Number of environment steps (stored transitions) between two training rounds
+        :param gradient_steps: Number of replay() updates per training round
+        :param warmup: Number of transitions in memory before the first update
+        :param update_target_freq: Number of environment steps between two target network syncs
+        :param target_update_tau: Fraction of the trained weights blended into the target network at a sync,
+            1 copies them (hard update), less gives a soft (Polyak) update
+        """
+        if train_every < 1 or gradient_steps < 0 or update_target_freq < 1:
+            raise ValueError("train_every and update_target_freq must be at least 1 and gradient_steps at least 0")
+        if not 0 < target_update_tau <= 1:
+            raise ValueError("target_update_tau must be in (0, 1]")
+
+        self.train_every = train_every
+        self.gradient_steps = gradient_steps
+        self.warmup = warmup
+        self.update_target_freq = update_target_freq
+        self.target_update_tau = target_update_tau
+
+    def is_warm(self, memory_size):
+        # True once the memory holds enough transitions to train on
+        return memory_size >= self.warmup
+
+    def updates_due(self, step):
+        # number of updates to run after the given environment step
+        return self.gradient_steps if step % self.train_every == 0 else 0
+
+    def total_updates_due(self, start_step, step):
+        # number of updates the steps in (start_step, step] add up to
+        return (step // self.train_every - start_step // self.train_every) * self.gradient_steps
+
+    def target_sync_due(self, step):
+        return step % self.update_target_freq == 0
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 
 
@@ -76,3 +77,137 @@ def find_hit_point_on_rectangle(start, end, rect):
 
 
 
+def rects_to_array(rects):
+    """
+    Packs pygame rects into a float array of [left, top, right, bottom] rows, the layout cast_rays expects.
+
+    Args:
+        rects: An iterable of pygame.Rect (or anything with x, y, width and height).
+
+    Returns:
+        A NumPy array of shape (N, 4).
+    """
+    rects = list(rects)
+    if not rects:
+        return np.empty((0, 4), dtype=np.float64)
+    array = np.array([(rect.x, rect.y, rect.width, rect.height) for rect in rects], dtype=np.float64)
+    array[:, 2] += array[:, 0]
+    array[:, 3] += array[:, 1]
+    return array
+
+
+def ray_end_points(start, angles, distance):
+    """
+    Computes the end point of every ray, matching pygame.Vector2(0, -distance).rotate(angle).
+
+    Args:
+        start: The shared origin of the rays (x, y).
+        angles: The ray angles in degrees.
+        distance: The length of every ray.
+
+    Returns:
+        A NumPy array of shape (R, 2).
+    """
+    radians = np.radians(np.asarray(angles, dtype=np.float64))
+    ends = np.empty((len(radians), 2), dtype=np.float64)
+    ends[:, 0] = start[0] + distance * np.sin(radians)
+    ends[:, 1] = start[1] - distance * np.cos(radians)
+    return ends
+
+
+def cast_rays(start, ends, rects):
+    """
+    Intersects every ray segment start -> ends[i] with every rectangle in a single slab-test pass.
+    This replaces calling find_hit_point_on_rectangle once per ray and per rectangle.
+
+    Like find_hit_point_on_rectangle, a ray that starts inside a rectangle hits the edge it leaves through,
+    and a ray that ends before reaching any edge does not hit at all.
+
+    Args:
+        start: The shared origin of the rays (x, y).
+        ends: A NumPy array of shape (R, 2) with the end point of each ray.
+        rects: A NumPy array of shape (N, 4) with [left, top, right, bottom] rows (see rects_to_array).
+
+    Returns:
+        A NumPy array of shape (R, N) holding, for every ray and rectangle, the fraction t in [0, 1] of the
+        ray at which it hits that rectangle, or np.inf if it misses.
+    """
+    origin = np.asarray(start, dtype=np.float64)
+    return cast_ray_batches(origin[None], np.asarray(ends, dtype=np.float64)[None], rects[None])[0]
+
+
+def ray_rect_hit(origin, direction, inverse, rect):
+    """
+    Scalar form of cast_rays for a single ray and rectangle, cheaper than NumPy for a handful of rectangles.
+    It computes exactly what cast_ray_batches computes.
+
+    Args:
+        origin: The origin of the ray (x, y).
+        direction: end - origin, as (dx, dy).
+        inverse: (1 / dx, 1 / dy), with None for a zero component.
+        rect: [left, top, right, bottom].
+
+    Returns:
+        The fraction t in [0, 1] of the ray at which it hits the rectangle, or math.inf if it misses.
+    """
+    t_near = -math.inf
+    t_far = math.inf
+    for axis in (0, 1):
+        low, high = rect[axis], rect[axis + 2]
+        if inverse[axis] is None:
+            # Parallel to this axis: only crosses the slab if the origin lies strictly inside it
+            if not (low < origin[axis] < high):
+                return math.inf
+            continue
+        t_1 = (low - origin[axis]) * inverse[axis]
+        t_2 = (high - origin[axis]) * inverse[axis]
+        t_near = max(t_near, min(t_1, t_2))
+        t_far = min(t_far, max(t_1, t_2))
+
+    t_hit = t_near if t_near >= 0 else t_far
+    if t_near <= t_far and 0 <= t_hit <= 1:
+        return t_hit
+    return math.inf
+
+
+def cast_ray_batches(starts, ends, rects):
+    """
+    Batched form of cast_rays: B independent groups of rays, each group with its own origin and rectangles.
+    Rectangles with NaN coordinates are never hit, which makes it easy to pad or mask them out.
+
+    Args:
+        starts: A NumPy array of shape (B, 2) with the origin of each group of rays.
+        ends: A NumPy array of shape (B, R, 2) with the end point of each ray.
+        rects: A NumPy array of shape (B, N, 4) with [left, top, right, bottom] rows.
+
+    Returns:
+        A NumPy array of shape (B, R, N) with the hit fraction t of every ray and rectangle, or np.inf.
+    """
+    origin_x = starts[:, None, None, 0]
+    origin_y = starts[:, None, None, 1]
+    direction = ends - starts[:, None, :]  # (B, R, 2)
+
+    # Ray fraction at which each slab boundary is crossed, shape (B, R, N) per boundary.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = 1.0 / direction
+        t_x1 = (rects[:, None, :, 0] - origin_x) * inverse[:, :, None, 0]
+        t_x2 = (rects[:, None, :, 2] - origin_x) * inverse[:, :, None, 0]
+        t_y1 = (rects[:, None, :, 1] - origin_y) * inverse[:, :, None, 1]
+        t_y2 = (rects[:, None, :, 3] - origin_y) * inverse[:, :, None, 1]
+
+    # Rays parallel to an axis only cross that slab if the origin lies strictly inside it.
+    for axis, t_low, t_high in ((0, t_x1, t_x2), (1, t_y1, t_y2)):
+        parallel = direction[:, :, axis] == 0
+        if parallel.any():
+            inside = (rects[:, :, axis] < starts[:, None, axis]) & (starts[:, None, axis] < rects[:, :, axis + 2])
+            parallel = parallel[:, :, None]
+            t_low[...] = np.where(parallel, -np.inf, t_low)
+            t_high[...] = np.where(parallel, np.where(inside[:, None, :], np.inf, -np.inf), t_high)
+
+    t_near = np.maximum(np.minimum(t_x1, t_x2), np.minimum(t_y1, t_y2))
+    t_far = np.minimum(np.maximum(t_x1, t_x2), np.maximum(t_y1, t_y2))
+
+    # Entry point if the origin is outside the rectangle, exit point if it is inside.
+    t_hit = np.where(t_near >= 0, t_near, t_far)
+    hit = (t_near <= t_far) & (t_hit >= 0) & (t_hit <= 1)
+    return np.where(hit, t_hit, np.inf)
@@ -0,0 +1,419 @@
+import math
+import random
+import numpy as np
+from components.world_gen import spawn_objects
+from components.utils import cast_ray_batches
+from components.sim_clock import SimClock
+from components.observation import WORLD_SCALE, VISION_SCALE, ROTATION_SCALE, MAX_AMMO_SCALE, OBSERVATION_SIZE
+
+# MyBot's discrete action space (see MyBot.action_to_dict): shoot or not x 4 movements x 7 rotations
+MOVEMENT_DIRECTIONS = ("forward", "right", "down", "left")
+ROTATION_ANGLES = np.array([-30, -5, -1, 0, 1, 5, 30])
+
+
+def decode_actions(indices):
+    """
+    Decodes MyBot action indices (an integer array of any shape) into the action arrays VecEnv.step expects.
+    """
+    indices = np.asarray(indices)
+    shoot = indices >= 28
+    local_action = np.where(shoot, indices - 28, indices)
+    movement_idx = local_action // 7
+    actions = {direction: movement_idx == index for index, direction in enumerate(MOVEMENT_DIRECTIONS)}
+    actions["rotate"] = ROTATION_ANGLES[local_action % 7]
+    actions["shoot"] = shoot
+    return actions
+
+
+class VecEnv:
+    """
+    N independent arenas stepped in lockstep, with all game state held in NumPy arrays
+    (one row per arena, one column per player) instead of Character objects.
+
+    The rules are the ones of Simulation (movement, rays, shooting, damage, reload, rewards and the game over
+    condition), applied player by player in the same order as Simulation.step, but vectorized over arenas.
+    Observations are returned already normalized like MyBot.normalize_state, as a float32 array of shape
+    (num_envs, num_players, OBSERVATION_SIZE). Finished arenas (one player left, or the time limit reached)
+    are reset automatically with a new obstacle layout.
+    """
+
+    # Player stats, same defaults as Character
+    player_size = 40
+    speed = 5
+    max_health = 100
+    damage = 20
+    delay = 0.3
+    max_ammo = 30
+    time_to_reload = 3
+    distance_vision = 1500
+    shot_distance = 5000
+    boundary_margin = 5
+    num_rays = 5
+    max_angle_view = 80
+
+    def __init__(self, num_envs=8, starting_positions=None, world_width=1280, world_height=1280, n_of_obstacles=10,
+                 tick_rate=120, time_limit=20, seed=None):
+        """
+        :param num_envs: Number of arenas
+        :param starting_positions: Top-left starting position of every player, the two players of main.py by default
+        :param tick_rate: Number of simulated ticks per game second (see SimClock)
+        :param time_limit: Seconds of game time after which an arena is reset even without a winner
+        :param seed: Seed for the obstacle layouts
+        """
+        if starting_positions is None:
+            starting_positions = [(world_width - 100, world_height - 100), (10, 10)]
+
+        self.num_envs = num_envs
+        self.num_players = len(starting_positions)
+        self.starting_positions = np.array(starting_positions, dtype=np.float64)
+        self.world_width = world_width
+        self.world_height = world_height
+        self.n_of_obstacles = n_of_obstacles
+        self.min_obstacle_size = (50, 50)
+        self.max_obstacle_size = (100, 100)
+        self.dt = 1 / tick_rate
+        self.time_limit = time_limit
+        # Timers count whole ticks, as Character's do with a SimClock
+        clock = SimClock(tick_rate)
+        self.delay_ticks = clock.seconds_to_ticks(self.delay)
+        self.reload_ticks = clock.seconds_to_ticks(self.time_to_reload)
+        self.time_limit_ticks = clock.seconds_to_ticks(time_limit)
+        self.rng = random.Random(seed)
+
+        n, p = num_envs, self.num_players
+
+        # Player state
+        self.positions = np.zeros((n, p, 2))  # top-left corner, like Character.rect
+        self.rotations = np.zeros((n, p))
+        self.health = np.zeros((n, p), dtype=np.int64)
+        self.current_ammo = np.zeros((n, p), dtype=np.int64)
+        self.alive = np.zeros((n, p), dtype=bool)
+        self.is_reloading = np.zeros((n, p), dtype=bool)
+        self.start_reloading_time = np.full((n, p), np.nan)  # ticks, NaN means None
+        self.last_shoot_time = np.full((n, p), np.nan)  # ticks
+        self.total_kills = np.zeros((n, p), dtype=np.int64)
+        self.damage_dealt = np.zeros((n, p), dtype=np.int64)
+        self.meters_moved = np.zeros((n, p), dtype=np.int64)
+        self.total_rotation = np.zeros((n, p))
+
+        # Obstacles as [left, top, right, bottom] rows, padded with NaN (never hit, never collided with)
+        self.obstacles = np.full((n, n_of_obstacles, 4), np.nan)
+
+        # Simulated time of every arena
+        self.ticks = np.zeros(n, dtype=np.int64)
+
+        # Reward bookkeeping, see Simulation.calculate_reward
+        self.reward_grid_size = 100
+        self.grid_cols = math.ceil(world_width / self.reward_grid_size)
+        self.grid_rows = math.ceil(world_height / self.reward_grid_size)
+        self.last_positions = np.zeros((n, p, 2))
+        self.last_damage = np.zeros((n, p), dtype=np.int64)
+        self.last_kills = np.zeros((n, p), dtype=np.int64)
+        self.last_health = np.zeros((n, p), dtype=np.int64)
+        self.reward_initialized = np.zeros(n, dtype=bool)
+        # One extra cell per player for positions outside the world (dead players)
+        self.visited_areas = np.zeros((n, p, self.grid_cols * self.grid_rows + 1), dtype=bool)
+
+        # Angle of every vision ray relative to the player's rotation, as in Character.create_rays
+        self.ray_angles = np.array([
+            i - self.max_angle_view / self.num_rays * (self.num_rays - 1) // 2
+            for i in range(0, self.max_angle_view, self.max_angle_view // self.num_rays)
+        ])
+
+        self.observations = np.zeros((n, p, OBSERVATION_SIZE), dtype=np.float32)
+
+    def get_world_bounds(self):
+        return (0, 0, self.world_width, self.world_height)
+
+    def reset(self):
+        self.reset_arenas(np.arange(self.num_envs))
+        return self.observe()
+
+    def reset_arenas(self, arenas):
+        """Resets the given arenas (an index array) with new obstacle layouts."""
+        for arena in arenas:
+            obstacles = spawn_objects(
+                self.get_world_bounds(),
+                self.max_obstacle_size,
+                self.min_obstacle_size,
+                self.n_of_obstacles,
+                rng=self.rng
+            )
+            self.obstacles[arena] = np.nan
+            for index, obstacle in enumerate(obstacles):
+                rect = obstacle.rect
+                self.obstacles[arena, index] = (rect.left, rect.top, rect.right, rect.bottom)
+
+        self.positions[arenas] = self.starting_positions
+        self.rotations[arenas] = 0
+        self.health[arenas] = self.max_health
+        self.current_ammo[arenas] = self.max_ammo
+        self.alive[arenas] = True
+        self.is_reloading[arenas] = False
+        self.start_reloading_time[arenas] = np.nan
+        self.last_shoot_time[arenas] = np.nan
+        self.total_kills[arenas] = 0
+        self.damage_dealt[arenas] = 0
+        self.meters_moved[arenas] = 0
+        self.total_rotation[arenas] = 0
+        self.ticks[arenas] = 0
+        self.reward_initialized[arenas] = False
+        self.visited_areas[arenas] = False
+
+    def get_centers(self):
+        return self.positions + self.player_size / 2
+
+    def get_player_rects(self):
+        # [left, top, right, bottom] of every player, shape (num_envs, num_players, 4)
+        return np.concatenate((self.positions, self.positions + self.player_size), axis=-1)
+
+    def step(self, actions):
+        """
+        Steps every arena by one tick.
+
+        :param actions: dict of arrays of shape (num_envs, num_players), with the keys of the bots' action
+            dictionaries: "forward", "right", "down", "left" and "shoot" (bool) and "rotate" (degrees).
+            decode_actions builds it from MyBot action indices.
+        :return: observations, rewards (num_envs, num_players), dones (num_envs,) and an info dict.
+            Observations of finished arenas are the ones after their automatic reset; the last observations
+            before it are in info["terminal_observations"].
+        """
+        self.ticks += 1
+        now = self.ticks  # the shooting and reloading timers are in ticks
+
+        # Which players took their turn this tick (alive when it came), as Simulation.step's alive_players
+        acted = np.zeros((self.num_envs, self.num_players), dtype=bool)
+
+        for player in range(self.num_players):
+            acting = self.alive[:, player].copy()
+            acted[:, player] = acting
+
+            self._reload(player, acting, now)
+            self._move(player, acting, actions)
+
+            rotate = np.where(acting, actions["rotate"][:, player], 0)
+            self.rotations[:, player] += rotate
+            self.total_rotation[:, player] += np.abs(rotate)
+
+            self._shoot(player, acting & actions["shoot"][:, player], now)
+
+        observations = self.observe()
+        rewards = self._calculate_rewards(actions["shoot"])
+
+        finished = acted.sum(axis=1) == 1
+        truncated = ~finished & (self.ticks > self.time_limit_ticks)
+        dones = finished | truncated
+
+        info = {
+            "finished": finished,
+            "truncated": truncated,
+            "alive_players": acted.sum(axis=1),
+            "episode_steps": self.ticks.copy(),
+            "terminal_observations": observations[dones].copy()
+        }
+
+        if dones.any():
+            self.reset_arenas(np.flatnonzero(dones))
+            observations = self.observe()
+
+        return observations, rewards, dones, info
+
+    def _reload(self, player, acting, now):
+        # Character.reload
+        reloading = acting & self.is_reloading[:, player]
+        starting = reloading & np.isnan(self.start_reloading_time[:, player])
+        done = reloading & ~starting & (now - self.start_reloading_time[:, player] >= self.reload_ticks)
+
+        self.start_reloading_time[starting, player] = now[starting]
+        self.current_ammo[done, player] = self.max_ammo
+        self.start_reloading_time[done, player] = np.nan
+        self.is_reloading[done, player] = False
+
+    def _move(self, player, acting, actions):
+        # Character.move with the displacement of all the requested directions, as in Simulation.step
+        dx = np.where(acting, (actions["right"][:, player].astype(np.int64) -
+                               actions["left"][:, player].astype(np.int64)) * self.speed, 0)
+        dy = np.where(acting, (actions["down"][:, player].astype(np.int64) -
+                               actions["forward"][:, player].astype(np.int64)) * self.speed, 0)
+        if not (dx.any() or dy.any()):
+            return
+
+        size = self.player_size
+        x = self.positions[:, player, 0]
+        y = self.positions[:, player, 1]
+        # [left, top, right, bottom] of every obstacle; the NaN padding fails every comparison, so never blocks
+        left, top, right, bottom = (self.obstacles[:, :, index] for index in range(4))
+
+        # x axis: stop against the nearest obstacle ahead that overlaps the player's rows, and at the boundaries
+        rows_overlap = (top < y[:, None] + size) & (bottom > y[:, None])
+        gap_right = np.where(rows_overlap & (left >= x[:, None] + size), left - (x[:, None] + size), np.inf).min(axis=1)
+        gap_left = np.where(rows_overlap & (right <= x[:, None]), x[:, None] - right, np.inf).min(axis=1)
+        max_x = self.world_width - self.boundary_margin - size
+        dx = np.where(dx > 0,
+                      np.maximum(0, np.minimum(np.minimum(dx, max_x - x), gap_right)),
+                      np.minimum(0, np.maximum(np.maximum(dx, self.boundary_margin - x), -gap_left)))
+        x = x + dx
+
+        # y axis, from the new x
+        columns_overlap = (left < x[:, None] + size) & (right > x[:, None])
+        gap_down = np.where(columns_overlap & (top >= y[:, None] + size), top - (y[:, None] + size), np.inf).min(axis=1)
+        gap_up = np.where(columns_overlap & (bottom <= y[:, None]), y[:, None] - bottom, np.inf).min(axis=1)
+        max_y = self.world_height - self.boundary_margin - size
+        dy = np.where(dy > 0,
+                      np.maximum(0, np.minimum(np.minimum(dy, max_y - y), gap_down)),
+                      np.minimum(0, np.maximum(np.maximum(dy, self.boundary_margin - y), -gap_up)))
+
+        self.positions[:, player, 0] = x
+        self.positions[:, player, 1] = y + dy
+        self.meters_moved[:, player] += (np.abs(dx) + np.abs(dy)).astype(np.int64)
+
+    def _shoot(self, player, shooting, now):
+        # Character.shoot: one ray straight ahead that damages the first player it hits, if any
+        has_ammo = shooting & (self.current_ammo[:, player] > 0)
+        on_delay = now - self.last_shoot_time[:, player] < self.delay_ticks  # False while last_shoot_time is NaN
+        firing = has_ammo & ~on_delay
+        if not firing.any():
+            return
+
+        arenas = np.flatnonzero(firing)
+        starts = self.get_centers()[arenas, player]
+        radians = np.radians(self.rotations[arenas, player])
+        ends = np.stack((starts[:, 0] + self.shot_distance * np.sin(radians),
+                         starts[:, 1] - self.shot_distance * np.cos(radians)), axis=-1)
+        # Obstacles, then the other players, then the world bounds: only the nearest hit counts (Character.hit_scan)
+        targets = self.get_player_rects()[arenas]
+        targets[:, player] = np.nan
+        bounds = np.broadcast_to(np.array(self.get_world_bounds(), dtype=np.float64), (len(arenas), 1, 4))
+        rects = np.concatenate((self.obstacles[arenas], targets, bounds), axis=1)
+        hits = cast_ray_batches(starts, ends[:, None, :], rects)[:, 0, :]
+        closest = hits.argmin(axis=1)
+        hit_player = np.isfinite(hits[np.arange(len(arenas)), closest]) & (closest >= self.n_of_obstacles) & \
+            (closest < self.n_of_obstacles + self.num_players)
+
+        for target in range(self.num_players):
+            hit = np.zeros(self.num_envs, dtype=bool)
+            hit[arenas] = hit_player & (closest == self.n_of_obstacles + target)
+            if hit.any():
+                self._do_damage(target, player, hit)
+
+        self.last_shoot_time[firing, player] = now[firing]
+        self.current_ammo[firing, player] -= 1
+        empty = firing & (self.current_ammo[:, player] <= 0) & np.isnan(self.start_reloading_time[:, player])
+        self.is_reloading[empty, player] = True
+        self.start_reloading_time[empty, player] = now[empty]
+
+    def _do_damage(self, target, attacker, hit):
+        # Character.do_damage, and the attacker's kill and damage counters
+        self.health[hit, target] -= self.damage
+        dying = hit & (self.health[:, target] <= 0)
+        killed = dying & self.alive[:, target]
+        wounded = hit & ~dying
+
+        self.alive[killed, target] = False
+        self.positions[killed, target] = -1000
+        self.current_ammo[killed, target] = 0
+
+        self.total_kills[killed, attacker] += 1
+        self.damage_dealt[wounded, attacker] += self.damage
+
+    def observe(self):
+        """
+        Casts every player's vision rays in every arena in one batch and writes the normalized
+        observations into self.observations, which is returned (and overwritten by the next call).
+        """
+        n, p, r = self.num_envs, self.num_players, self.num_rays
+        centers = self.get_centers()
+
+        # Rays of all players of all arenas as one batch of num_envs * num_players groups
+        radians = np.radians(self.rotations[:, :, None] + self.ray_angles)
+        ends = np.empty((n, p, r, 2))
+        ends[..., 0] = centers[:, :, None, 0] + self.distance_vision * np.sin(radians)
+        ends[..., 1] = centers[:, :, None, 1] - self.distance_vision * np.cos(radians)
+
+        # Obstacles, then the other players (own rect masked out), then the world bounds
+        others = np.broadcast_to(self.get_player_rects()[:, None], (n, p, p, 4)).copy()
+        others[:, np.arange(p), np.arange(p)] = np.nan
+        bounds = np.broadcast_to(np.array(self.get_world_bounds(), dtype=np.float64), (n, p, 1, 4))
+        rects = np.concatenate((
+            np.broadcast_to(self.obstacles[:, None], (n, p, self.n_of_obstacles, 4)),
+            others,
+            bounds
+        ), axis=2)
+
+        hits = cast_ray_batches(
+            centers.reshape(n * p, 2),
+            ends.reshape(n * p, r, 2),
+            rects.reshape(n * p, -1, 4)
+        ).reshape(n, p, r, -1)
+        closest = hits.argmin(axis=-1)
+        t = np.take_along_axis(hits, closest[..., None], axis=-1)[..., 0]
+        hit = np.isfinite(t)
+        t = np.where(hit, t, 1.0)
+
+        first_player = self.n_of_obstacles
+        hit_type = np.where(~hit, 0.0, np.where((closest >= first_player) & (closest < first_player + p), 1.0, 0.5))
+        hit_points = centers[:, :, None, :] + t[..., None] * (ends - centers[:, :, None, :])
+        distances = np.where(hit, t * self.distance_vision, self.distance_vision)
+
+        obs = self.observations
+        obs[:, :, 0:2] = centers / WORLD_SCALE
+        obs[:, :, 2] = self.rotations / ROTATION_SCALE
+        obs[:, :, 3] = self.current_ammo / MAX_AMMO_SCALE
+        rays = obs[:, :, 4:].reshape(n, p, r, 6)
+        rays[..., 0:2] = centers[:, :, None, :] / WORLD_SCALE
+        rays[..., 2:4] = hit_points / WORLD_SCALE
+        rays[..., 4] = distances / VISION_SCALE
+        rays[..., 5] = hit_type
+        return obs
+
+    def _calculate_rewards(self, shot_fired):
+        # Simulation.calculate_reward for every player of every arena
+        centers = self.get_centers()
+
+        new = ~self.reward_initialized
+        self.last_positions[new] = centers[new]
+        self.last_damage[new] = self.damage_dealt[new]
+        self.last_kills[new] = self.total_kills[new]
+        self.last_health[new] = self.health[new]
+        self.reward_initialized[:] = True
+
+        rewards = np.zeros((self.num_envs, self.num_players))
+
+        # 1. Walking
+        moved = np.any(centers != self.last_positions, axis=-1)
+        rewards += np.where(moved, 0.01, 0)
+
+        # 2. Exploring
+        cols = (centers[..., 0] // self.reward_grid_size).astype(np.int64)
+        rows = (centers[..., 1] // self.reward_grid_size).astype(np.int64)
+        in_grid = (cols >= 0) & (cols < self.grid_cols) & (rows >= 0) & (rows < self.grid_rows)
+        cells = np.where(in_grid, rows * self.grid_cols + cols, self.grid_cols * self.grid_rows)
+        visited = np.take_along_axis(self.visited_areas, cells[..., None], axis=-1)[..., 0]
+        rewards += np.where(visited, 0, 0.1)
+        np.put_along_axis(self.visited_areas, cells[..., None], True, axis=-1)
+
+        # 3. Damage, 4. Kills and 5. Missing
+        delta_damage = self.damage_dealt - self.last_damage
+        rewards += np.where(delta_damage > 0, delta_damage * 2, 0)
+        delta_kills = self.total_kills - self.last_kills
+        rewards += np.where(delta_kills > 0, delta_kills * 15, 0)
+        rewards -= np.where(shot_fired & (delta_damage <= 0), 1, 0)
+
+        # 6. Getting hit
+        delta_health = self.last_health - self.health
+        rewards -= np.where(delta_health > 0, delta_health * 0.2, 0)
+
+        # 7. Staying near the borders
+        border_threshold = 50
+        near_border = ((centers[..., 0] < border_threshold) | (centers[..., 0] > self.world_width - border_threshold) |
+                       (centers[..., 1] < border_threshold) | (centers[..., 1] > self.world_height - border_threshold))
+        rewards -= np.where(near_border, 1, 0)
+
+        self.last_positions[:] = centers
+        self.last_damage[:] = self.damage_dealt
+        self.last_kills[:] = self.total_kills
+        self.last_health[:] = self.health
+
+        decay_rate = 0.0001
+        time_multiplier = np.maximum(0.2, 1 - decay_rate * self.ticks)
+        return rewards * time_multiplier[:, None]
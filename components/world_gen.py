@@ -3,15 +3,18 @@ from components.obstacle import Obstacle
 import math
 
 
-def spawn_objects(world_boundaries, max_object_size, min_object_size, num_objects):
+def spawn_objects(world_boundaries, max_object_size, min_object_size, num_objects, rng=None):
     """
     Spawn a number of objects with random sizes and positions, keeping corners empty
     :param world_boundaries: The boundaries of the world (left, top, right, bottom)
     :param max_object_size: The maximum size of the object (width, height)
     :param min_object_size: The minimum size of the object (width, height)
     :param num_objects: The number of objects to spawn
+    :param rng: Optional random.Random to draw from (e.g. a seeded one), the global random module otherwise
     :return: A list of objects
     """
+    if rng is None:
+        rng = random
     CORNER_RADIUS = 150  # Clear radius from corners
     objects = []
 
@@ -57,15 +60,15 @@ def spawn_objects(world_boundaries, max_object_size, min_object_size, num_object
 
     while len(objects) < num_objects and attempts < max_attempts:
         # Generate random size
-        width = random.randint(min_object_size[0], max_object_size[0])
-        height = random.randint(min_object_size[1], max_object_size[1])
+        width = rng.randint(min_object_size[0], max_object_size[0])
+        height = rng.randint(min_object_size[1], max_object_size[1])
 
         # Generate random position, keeping some padding from boundaries
-        x = random.randint(
+        x = rng.randint(
             world_boundaries[0],
             world_boundaries[2] - width
         )
-        y = random.randint(
+        y = rng.randint(
             world_boundaries[1],
             world_boundaries[3] - height
         )
@@ -18,6 +18,12 @@ def main():
 
     load_back = True
     state_size = 34
+    async_training = False  # train in background learner threads instead of inside the game loop
+    # Spectator mode: max_tick_rate = None and render_fps = 30 run the simulation at full speed and show 30 frames
+    # per second of it
+    max_tick_rate = 120  # steps per second, None for as fast as possible
+    render_fps = None  # rendered frames per second, None renders every step
+    record_path = None  # e.g. "matches.gdcr" to record every episode (replay with python -m components.recording)
 
     # Create the environment.
     env = Env(training=False,
@@ -26,7 +32,9 @@ def main():
               world_height=world_height,
               display_width=display_width,
               display_height=display_height,
-              n_of_obstacles=n_of_obstacles)
+              n_of_obstacles=n_of_obstacles,
+              max_tick_rate=max_tick_rate,
+              render_fps=render_fps)
     screen = env.world_surface
     world_bounds = env.get_world_bounds()
 
@@ -48,7 +56,8 @@ def main():
     # Total state size = 2 + 1 + 1 + 8 = 12
 
 
-    bots = [MyBot(action_size=56), MyBot(action_size=56)]
+    bots = [MyBot(action_size=56, async_training=async_training),
+            MyBot(action_size=56, async_training=async_training)]
 
     if load_back:
         for idx, bot in enumerate(bots):
@@ -61,9 +70,11 @@ def main():
 
     # Link players, bots, and obstacles into the environment.
     env.set_players_bots_objects(players, bots)
+    if record_path is not None:
+        env.start_recording(record_path)
 
     # Training / Game parameters.
-    time_limit = 20  # seconds per episode
+    time_limit = 20  # seconds of game time per episode
     num_epochs = 100  # number of episodes
 
     for epoch in range(num_epochs):
@@ -73,7 +84,8 @@ def main():
 
         while True:
             # If the time limit for this episode has been reached, break.
-            if time.time() - start_time > time_limit:
+            # Uses the simulated clock, so episodes last as many steps however fast they run.
+            if env.sim_clock.now() > time_limit:
                 print("Time limit reached for this episode.")
                 break
 
@@ -81,16 +93,15 @@ def main():
             # The environment calls each player's .act() method, which in turn uses the bot.
             finished, info = env.step(debugging=False)
 
-            # For each player, calculate reward, update bot memory, and train the bot.
+            # For each player, calculate reward and update bot memory.
             for player, bot in zip(players, bots):
                 # Calculate the reward for the current step (adjust calculate_reward as needed).
                 reward = env.calculate_reward(info, player.username)
                 # Retrieve the updated state for the player.
                 next_info = player.get_info()
                 # Store the transition (last state, action, reward, next state, done).
+                # The bot trains on its own, following its TrainingSchedule.
                 bot.remember(reward, next_info, finished)
-                # Train the bot from experience.
-                bot.replay()
 
                 #print(f"Reward for {player.username}: {reward}")
 
@@ -105,6 +116,10 @@ def main():
             bot.save(save_path)
             print(f"Saved model for player {players[idx].username} to {save_path}")
 
+    for bot in bots:
+        bot.stop_learner()
+    env.stop_recording()
+
     pygame.quit()
 
 if __name__ == "__main__":
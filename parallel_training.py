@@ -0,0 +1,243 @@
+"""
+Parallel self-play training.
+
+Several worker processes each run a headless Env with copies of the bots' policies and stream their
+transitions to the learner (this process), which owns the trained MyBot models. The learner pushes
+updated weights (and exploration rate) back to the workers periodically.
+"""
+import os
+import queue
+import random
+import time
+
+import torch
+import torch.multiprocessing as mp
+
+from Environment import Env
+from components.my_bot import MyBot
+from components.character import Character
+from components.training_schedule import TrainingSchedule
+
+
+def state_to_array(state):
+    # normalized state dict -> one flat float32 array (cheap to send between processes)
+    return torch.cat([state['location'], state['status'], state['rays']]).numpy()
+
+
+def array_to_state(array):
+    tensor = torch.from_numpy(array)
+    return {
+        'location': tensor[0:2],
+        'status': tensor[2:4],
+        'rays': tensor[4:34]
+    }
+
+
+def create_players(world_bounds, screen=None):
+    # Same setup as main.py
+    return [
+        Character((world_bounds[2] - 100, world_bounds[3] - 100),
+                  screen, boundaries=world_bounds, username="Ninja"),
+        Character((world_bounds[0] + 10, world_bounds[1] + 10),
+                  screen, boundaries=world_bounds, username="Faze Jarvis")
+    ]
+
+
+def rollout_worker(worker_id, config, transition_queue, weight_queue, stop_event):
+    """Plays episodes with the latest weights received from the learner and sends back every transition."""
+    torch.set_num_threads(1)
+    random.seed(config["seed"] + worker_id)
+
+    env = Env(training=True,
+              use_game_ui=False,
+              world_width=config["world_width"],
+              world_height=config["world_height"],
+              n_of_obstacles=config["n_of_obstacles"])
+    players = create_players(env.get_world_bounds())
+    # The workers only act, their transitions are stored by the learners
+    bots = [MyBot(action_size=config["action_size"], device="cpu", memory_capacity=0) for _ in players]
+    env.set_players_bots_objects(players, bots)
+
+    def sync_weights():
+        latest = None
+        while True:
+            try:
+                latest = weight_queue.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            for bot, model_state, epsilon in zip(bots, latest["models"], latest["epsilons"]):
+                bot.model.load_state_dict(model_state)
+                bot.epsilon = epsilon
+
+    def send(batch):
+        # Block while the learner is behind, but never past a stop request
+        while not stop_event.is_set():
+            try:
+                transition_queue.put(batch, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    batch = []
+    while not stop_event.is_set():
+        env.reset(randomize_objects=True)
+
+        while not stop_event.is_set():
+            sync_weights()
+
+            finished, info = env.step()
+
+            for index, (player, bot) in enumerate(zip(players, bots)):
+                reward = env.calculate_reward(info, player.username)
+                next_state = bot.normalize_state(player.get_info())
+                batch.append((index, state_to_array(bot.last_state), bot.last_action, reward,
+                              state_to_array(next_state), finished))
+
+            if len(batch) >= config["send_every"]:
+                send(batch)
+                batch = []
+
+            if finished or env.sim_clock.now() > config["time_limit"]:
+                break
+
+
+def train_parallel(num_workers=4, total_transitions=1_000_000, sync_every=5_000, send_every=64, action_size=56,
+                   world_width=1280, world_height=1280, n_of_obstacles=25, time_limit=20, load_back=True,
+                   save_every=100_000, seed=0, learn_chunk=1024, schedule=None, worker_timeout=60):
+    """
+    Runs num_workers rollout workers and trains one MyBot per player slot on everything they play.
+
+    :param total_transitions: Number of transitions to learn from before stopping
+    :param sync_every: Number of transitions between two weight pushes to the workers
+    :param send_every: Number of transitions a worker batches together before sending them
+    :param save_every: Number of transitions between two checkpoints (bot_model_{idx}.pth, as in main.py)
+    :param learn_chunk: Maximum number of transitions drained from the workers before the learner trains on
+        them; each learner then runs the updates its TrainingSchedule gives for that many steps in one go
+    :param schedule: The TrainingSchedule of the learners, MyBot's (one update per transition) by default.
+        The workers produce about num_workers times as many transitions per second as one environment, and
+        the learners can only keep up if the updates per transition drop accordingly: scale train_every with
+        num_workers (e.g. TrainingSchedule(train_every=num_workers)), and raise gradient_steps rather than
+        train_every if the models train too little per transition
+    :param worker_timeout: Seconds to wait for transitions before checking that the workers are still running
+    """
+    config = {
+        "action_size": action_size,
+        "world_width": world_width,
+        "world_height": world_height,
+        "n_of_obstacles": n_of_obstacles,
+        "time_limit": time_limit,
+        "send_every": send_every,
+        "seed": seed
+    }
+
+    learners = [MyBot(action_size=action_size, schedule=schedule) for _ in range(2)]
+    if load_back:
+        for idx, bot in enumerate(learners):
+            save_path = f"bot_model_{idx}.pth"
+            try:
+                bot.load(save_path)
+                print(f"Load model for player slot {idx} from {save_path}")
+            except:
+                print(f"Failed to load model for player slot {idx} from {save_path}")
+
+    # spawn (not fork) so that workers never inherit CUDA state from the learner
+    context = mp.get_context("spawn")
+    transition_queue = context.Queue(maxsize=num_workers * 16)
+    weight_queues = [context.Queue(maxsize=1) for _ in range(num_workers)]
+    stop_event = context.Event()
+
+    def push_weights():
+        update = {
+            "models": [{k: v.detach().cpu() for k, v in bot.model.state_dict().items()} for bot in learners],
+            "epsilons": [bot.epsilon for bot in learners]
+        }
+        for weight_queue in weight_queues:
+            # Replace an update the worker has not picked up yet
+            try:
+                weight_queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                weight_queue.put_nowait(update)
+            except queue.Full:
+                pass
+
+    push_weights()
+    workers = [
+        context.Process(target=rollout_worker,
+                        args=(worker_id, config, transition_queue, weight_queues[worker_id], stop_event),
+                        daemon=True)
+        for worker_id in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    received = 0
+    start_time = time.time()
+    try:
+        while received < total_transitions:
+            # Drain what the workers sent in one chunk, then train on it at once
+            try:
+                batches = [transition_queue.get(timeout=worker_timeout)]
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError("All rollout workers exited, exit codes {}".format(
+                        [worker.exitcode for worker in workers]))
+                continue
+            chunk_size = len(batches[0])
+            while chunk_size < learn_chunk:
+                try:
+                    batches.append(transition_queue.get_nowait())
+                except queue.Empty:
+                    break
+                chunk_size += len(batches[-1])
+
+            chunks = [[] for _ in learners]
+            for batch in batches:
+                for index, state, action, reward, next_state, done in batch:
+                    chunks[index].append((array_to_state(state), action, reward, array_to_state(next_state), done))
+            for bot, chunk in zip(learners, chunks):
+                bot.add_experiences(chunk)
+
+            previous = received
+            received += chunk_size
+
+            if received // sync_every > previous // sync_every:
+                push_weights()
+                print("{} transitions, {:.0f} per second".format(received, received / (time.time() - start_time)))
+
+            if received // save_every > previous // save_every:
+                for idx, bot in enumerate(learners):
+                    bot.save(f"bot_model_{idx}.pth")
+    finally:
+        stop_event.set()
+        # Drain the queue so that no worker stays blocked on it
+        while any(worker.is_alive() for worker in workers):
+            try:
+                transition_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for worker in workers:
+            worker.join()
+
+    for idx, bot in enumerate(learners):
+        save_path = f"bot_model_{idx}.pth"
+        bot.save(save_path)
+        print(f"Saved model for player slot {idx} to {save_path}")
+
+    return learners
+
+
+def main():
+    # Training parameters.
+    num_workers = max(1, (os.cpu_count() or 2) - 1)  # one core stays with the learner
+    total_transitions = 1_000_000
+    # One update every num_workers transitions, so that the learners keep up with the workers
+    schedule = TrainingSchedule(train_every=num_workers)
+
+    train_parallel(num_workers=num_workers, total_transitions=total_transitions, schedule=schedule)
+
+
+if __name__ == "__main__":
+    main()